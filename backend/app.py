@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, g, make_response
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
@@ -6,10 +6,19 @@ import pyzbar.pyzbar as pyzbar
 import cv2
 import numpy as np
 import logging
-from datetime import datetime
+from datetime import datetime, date, timedelta
 import json
 import sqlite3
+import atexit
+import threading
+import click
 from contextlib import contextmanager
+from timeseries import ScanTimeSeries, parse_duration, MAX_WINDOW
+from catalog import Catalog
+from columnstore import ColumnStore
+from leaderboard import Leaderboard, load_secret
+from placeholders import PlaceholderCache, parse_color, DEFAULT_BACKGROUND, DEFAULT_FOREGROUND
+from scanlog import ScanArchive, SCAN_CATEGORY_SQL, LIVE_SCANS_SQL, partition_bounds, utc_today
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -17,6 +26,15 @@ CORS(app)  # Enable CORS for frontend integration
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # 5MB limit
 app.config['DATABASE'] = 'ecoscore.db'
+# Key for public user ids; generated next to the database if not set
+app.config['USER_ID_SECRET'] = os.environ.get('USER_ID_SECRET') or None
+app.config['ARCHIVE_FOLDER'] = os.environ.get('ARCHIVE_FOLDER', 'archive')
+app.config['SCAN_RETENTION_DAYS'] = int(os.environ.get('SCAN_RETENTION_DAYS', 30))
+app.config['SCAN_COMPACTION_INTERVAL'] = int(os.environ.get('SCAN_COMPACTION_INTERVAL', 3600))  # seconds
+app.config['CATALOG_FOLDER'] = os.environ.get('CATALOG_FOLDER', 'catalog')
+app.config['CATALOG_SEED'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog_seed.json')
+app.config['COLUMN_STORE_FOLDER'] = os.environ.get('COLUMN_STORE_FOLDER', 'colstore')
+app.config['TIMESERIES_FLUSH_INTERVAL'] = int(os.environ.get('TIMESERIES_FLUSH_INTERVAL', 30))  # seconds
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -24,220 +42,33 @@ logger = logging.getLogger(__name__)
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Enhanced product database with more realistic data
-MOCK_PRODUCTS = {
-    # Beauty Category - Shampoo from the barcode image
-    "036000291452": {
-        "itemId": "36000291452",
-        "name": "Head & Shoulders Classic Clean Shampoo",
-        "category": "Beauty",
-        "price": "$4.97",
-        "image": "/images/shampoo-barcode.png",
-        "description": "Anti-dandruff shampoo with zinc pyrithione for clean, healthy hair",
-        "attributes": {
-            "brand": "Head & Shoulders",
-            "material": "Chemical-based",
-            "packaging": "Plastic bottle",
-            "ingredients": "Zinc pyrithione, sulfates",
-            "certifications": [],
-            "biodegradable": False,
-            "recyclable": True,
-            "size": "13.5 fl oz",
-            "origin": "USA"
-        }
-    },
-    # Beauty Category
-    "123456789": {
-        "itemId": "12417832",
-        "name": "Organic Lavender Shampoo",
-        "category": "Beauty",
-        "price": "$9.99",
-        "image": "/api/placeholder/300/300",
-        "description": "Gentle organic shampoo with natural lavender extract",
-        "attributes": {
-            "brand": "EcoClean",
-            "material": "Organic",
-            "packaging": "Recycled plastic",
-            "ingredients": "Plant-based, SLS-free",
-            "certifications": ["USDA Organic", "Leaping Bunny"],
-            "biodegradable": False,
-            "recyclable": True,
-            "size": "16 fl oz",
-            "origin": "USA"
-        }
-    },
-    "234567890": {
-        "itemId": "23568914",
-        "name": "Bamboo Hairbrush",
-        "category": "Beauty",
-        "price": "$12.99",
-        "image": "/api/placeholder/300/300",
-        "description": "Sustainable bamboo hairbrush with natural bristles",
-        "attributes": {
-            "brand": "GreenTools",
-            "material": "Bamboo",
-            "packaging": "Cardboard",
-            "biodegradable": True,
-            "recyclable": True,
-            "durability": "High",
-            "bristles": "Natural boar hair",
-            "origin": "China"
-        }
-    },
-    # Personal Care Category
-    "345678901": {
-        "itemId": "34679025",
-        "name": "Recycled Paper Towels",
-        "category": "Home",
-        "price": "$4.99",
-        "image": "/api/placeholder/300/300",
-        "description": "Strong and absorbent paper towels made from 100% recycled materials",
-        "attributes": {
-            "brand": "EcoHome",
-            "material": "Recycled paper",
-            "packaging": "Paper",
-            "biodegradable": True,
-            "recyclable": True,
-            "postConsumerWaste": "80%",
-            "sheets": "120 sheets per roll",
-            "rolls": "6 rolls"
-        }
-    },
-    "456789012": {
-        "itemId": "45780136",
-        "name": "Metal Safety Razor",
-        "category": "Personal Care",
-        "price": "$19.99",
-        "image": "/api/placeholder/300/300",
-        "description": "Durable stainless steel safety razor for zero-waste shaving",
-        "attributes": {
-            "brand": "ZeroWaste",
-            "material": "Stainless steel",
-            "packaging": "Metal tin",
-            "biodegradable": False,
-            "recyclable": True,
-            "lifespan": "Lifetime",
-            "blades": "10 replacement blades included",
-            "weight": "3.2 oz"
-        }
-    },
-    # Grocery Category
-    "567890123": {
-        "itemId": "56891247",
-        "name": "Organic Fair Trade Coffee",
-        "category": "Grocery",
-        "price": "$8.49",
-        "image": "/api/placeholder/300/300",
-        "description": "Rich, full-bodied coffee beans sourced from sustainable farms",
-        "attributes": {
-            "brand": "EarthBean",
-            "material": "Organic coffee",
-            "packaging": "Compostable bag",
-            "certifications": ["USDA Organic", "Fair Trade"],
-            "biodegradable": True,
-            "carbonNeutral": True,
-            "roast": "Medium",
-            "origin": "Guatemala",
-            "weight": "12 oz"
-        }
-    },
-    "678901234": {
-        "itemId": "67902358",
-        "name": "Glass Jar Honey",
-        "category": "Grocery",
-        "price": "$6.99",
-        "image": "/api/placeholder/300/300",
-        "description": "Pure wildflower honey from local beekeepers",
-        "attributes": {
-            "brand": "BeeGood",
-            "material": "Glass",
-            "packaging": "Glass jar with metal lid",
-            "local": True,
-            "recyclable": True,
-            "reusable": True,
-            "type": "Wildflower",
-            "size": "16 oz",
-            "origin": "Local farms"
-        }
-    },
-    # Home Category
-    "789012345": {
-        "itemId": "78013469",
-        "name": "Eco Laundry Detergent",
-        "category": "Home",
-        "price": "$11.49",
-        "image": "/api/placeholder/300/300",
-        "description": "Concentrated plant-based laundry detergent for sensitive skin",
-        "attributes": {
-            "brand": "CleanGreen",
-            "material": "Plant-based",
-            "packaging": "Recycled HDPE plastic",
-            "biodegradable": True,
-            "recyclable": True,
-            "concentrated": True,
-            "loads": "64 loads",
-            "scent": "Lavender",
-            "hypoallergenic": True
-        }
-    },
-    "890123456": {
-        "itemId": "89124570",
-        "name": "Plastic Sponge",
-        "category": "Home",
-        "price": "$2.49",
-        "image": "/api/placeholder/300/300",
-        "description": "Multi-purpose cleaning sponge for kitchen and bathroom",
-        "attributes": {
-            "brand": "QuickClean",
-            "material": "Synthetic fibers",
-            "packaging": "Plastic wrap",
-            "biodegradable": False,
-            "recyclable": False,
-            "durability": "Low",
-            "count": "4 sponges",
-            "antimicrobial": True
-        }
-    },
-    # Kitchen Category
-    "901234567": {
-        "itemId": "90235681",
-        "name": "Bamboo Cutting Board",
-        "category": "Kitchen",
-        "price": "$14.99",
-        "image": "/api/placeholder/300/300",
-        "description": "Durable bamboo cutting board with juice groove",
-        "attributes": {
-            "brand": "BambooWare",
-            "material": "Bamboo",
-            "packaging": "Recycled cardboard",
-            "biodegradable": True,
-            "recyclable": True,
-            "lifespan": "5+ years",
-            "size": "12x8 inches",
-            "thickness": "0.75 inches",
-            "antimicrobial": True
-        }
-    },
-    "012345678": {
-        "itemId": "01346792",
-        "name": "Plastic Food Container",
-        "category": "Kitchen",
-        "price": "$3.99",
-        "image": "/api/placeholder/300/300",
-        "description": "Airtight food storage container for meal prep",
-        "attributes": {
-            "brand": "StoreRight",
-            "material": "Polypropylene",
-            "packaging": "Plastic wrap",
-            "biodegradable": False,
-            "recyclable": True,
-            "bpaFree": True,
-            "capacity": "32 oz",
-            "microwaveSafe": True,
-            "dishwasherSafe": True
-        }
-    }
-}
+# Per-minute scan counters for time-series analytics
+scan_timeseries = ScanTimeSeries(app.config['DATABASE'])
+
+# Retention and archival of old scan partitions
+scan_archive = ScanArchive(
+    app.config['DATABASE'],
+    app.config['ARCHIVE_FOLDER'],
+    retention_days=app.config['SCAN_RETENTION_DAYS']
+)
+
+# Columnar scan events for vectorised analytics
+scan_columns = ColumnStore(app.config['COLUMN_STORE_FOLDER'])
+
+# Memory-mapped product catalog shared by all worker processes
+catalog = Catalog(app.config['CATALOG_FOLDER'])
+
+# Ranked eco-points index for the leaderboard
+leaderboard = Leaderboard(
+    app.config['DATABASE'],
+    app.config['USER_ID_SECRET'] or load_secret(
+        os.path.join(os.path.dirname(os.path.abspath(app.config['DATABASE'])), '.user_id_secret')
+    )
+)
+
+# Placeholder images rendered in-process; common sizes are ready before the first request
+placeholders = PlaceholderCache()
+placeholders.prerender()
 
 # Database setup
 def init_db():
@@ -253,6 +84,8 @@ def init_db():
                 user_ip TEXT
             )
         ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_scans_timestamp ON scans (timestamp)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_scans_barcode ON scans (barcode)')
         conn.execute('''
             CREATE TABLE IF NOT EXISTS user_stats (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -263,6 +96,26 @@ def init_db():
                 last_scan DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        migrated = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_user_stats_user_ip'"
+        ).fetchone()
+        if not migrated:
+            # Older databases added a row per scan, each computed from the
+            # user's first row, so no row holds the real totals; rebuild them
+            # from the scan log
+            conn.execute('DELETE FROM user_stats')
+            conn.execute('''
+                INSERT INTO user_stats (user_ip, total_scans, eco_points, last_scan)
+                SELECT user_ip, COUNT(*), COALESCE(SUM(ecoscore), 0) * 10, MAX(timestamp)
+                FROM scans
+                WHERE user_ip IS NOT NULL
+                GROUP BY user_ip
+            ''')
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_user_stats_user_ip ON user_stats (user_ip)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_user_stats_points ON user_stats (eco_points DESC, user_ip)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_user_stats_last_scan ON user_stats (last_scan)')
+        ScanTimeSeries.init_tables(conn)
+        ScanArchive.init_tables(conn)
         conn.commit()
 
 @contextmanager
@@ -285,13 +138,18 @@ def log_scan(barcode, product_name, ecoscore, user_ip):
             )
             # Update user stats
             conn.execute('''
-                INSERT OR REPLACE INTO user_stats (user_ip, total_scans, eco_points, last_scan)
-                VALUES (?, 
-                    COALESCE((SELECT total_scans FROM user_stats WHERE user_ip = ?), 0) + 1,
-                    COALESCE((SELECT eco_points FROM user_stats WHERE user_ip = ?), 0) + ?,
-                    CURRENT_TIMESTAMP)
-            ''', (user_ip, user_ip, user_ip, ecoscore * 10))
+                INSERT INTO user_stats (user_ip, total_scans, eco_points, last_scan)
+                VALUES (?, 1, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(user_ip) DO UPDATE SET
+                    total_scans = total_scans + 1,
+                    eco_points = eco_points + excluded.eco_points,
+                    last_scan = CURRENT_TIMESTAMP
+            ''', (user_ip, ecoscore * 10))
+            stats = conn.execute(
+                'SELECT total_scans, eco_points, last_scan FROM user_stats WHERE user_ip = ?', (user_ip,)
+            ).fetchone()
             conn.commit()
+        leaderboard.update(user_ip, stats['eco_points'], stats['total_scans'], stats['last_scan'])
     except Exception as e:
         logger.error(f"Database logging error: {e}")
 
@@ -390,236 +248,13 @@ def generate_ecoscore(product):
     # Normalize to 1-5 scale
     return min(5, max(1, round(score)))
 
-def get_alternatives(product):
+def get_alternatives(product, seed):
     """Return logically related alternatives with better EcoScores"""
-    category = product["category"]
-    current_score = generate_ecoscore(product)
     product_name = product["name"].lower()
-    
-    # Beauty alternatives
-    if category == "Beauty":
-        if "shampoo" in product_name:
-            return [
-                {
-                    "id": "235689",
-                    "name": "Shampoo Bar (Package Free)",
-                    "ecoscore": 5,
-                    "price": "$7.99",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "Eliminates plastic bottle entirely",
-                    "attributes": {
-                        "material": "Solid formulation",
-                        "packaging": "None",
-                        "wasteReduction": "100% packaging-free",
-                        "biodegradable": True,
-                        "certifications": ["Vegan", "Cruelty-Free"]
-                    }
-                },
-                {
-                    "id": "874563",
-                    "name": "Refillable Shampoo System",
-                    "ecoscore": 4,
-                    "price": "$12.99 (includes bottle)",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "Reduces packaging waste by 80%",
-                    "attributes": {
-                        "material": "Liquid concentrate",
-                        "packaging": "Aluminum bottle",
-                        "refillCount": "10+ uses",
-                        "recyclable": True
-                    }
-                }
-            ]
-        elif "hairbrush" in product_name:
-            return [
-                {
-                    "id": "345712",
-                    "name": "100% Biodegradable Hairbrush",
-                    "ecoscore": 5,
-                    "price": "$14.99",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "Fully compostable including bristles",
-                    "attributes": {
-                        "material": "Wood and natural bristles",
-                        "packaging": "None",
-                        "biodegradable": True,
-                        "compostTime": "6-12 months"
-                    }
-                }
-            ]
-    
-    # Personal Care alternatives
-    elif category == "Personal Care":
-        if "razor" in product_name:
-            return [
-                {
-                    "id": "456123",
-                    "name": "Compostable Bamboo Razor",
-                    "ecoscore": 5,
-                    "price": "$9.99",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "Fully biodegradable alternative",
-                    "attributes": {
-                        "material": "Bamboo with steel blade",
-                        "packaging": "Compostable cellulose",
-                        "biodegradable": True,
-                        "bladeReplacements": "Yes"
-                    }
-                }
-            ]
-    
-    # Home alternatives
-    elif category == "Home":
-        if "sponge" in product_name:
-            return [
-                {
-                    "id": "678345",
-                    "name": "Plant-Based Loofah Sponge",
-                    "ecoscore": 5,
-                    "price": "$4.49",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "100% natural and compostable",
-                    "attributes": {
-                        "material": "Loofah plant",
-                        "packaging": "None",
-                        "compostTime": "3-6 months",
-                        "biodegradable": True
-                    }
-                },
-                {
-                    "id": "789123",
-                    "name": "Reusable Silicone Sponge",
-                    "ecoscore": 4,
-                    "price": "$6.99",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "Lasts years instead of weeks",
-                    "attributes": {
-                        "material": "Food-grade silicone",
-                        "packaging": "Recycled paper",
-                        "lifespan": "2+ years",
-                        "recyclable": True
-                    }
-                }
-            ]
-        elif "detergent" in product_name:
-            return [
-                {
-                    "id": "890456",
-                    "name": "Laundry Detergent Sheets",
-                    "ecoscore": 5,
-                    "price": "$12.99 (60 loads)",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "Ultra-lightweight, no plastic",
-                    "attributes": {
-                        "material": "Concentrated sheets",
-                        "packaging": "Compostable pouch",
-                        "carbonFootprint": "80% lower",
-                        "biodegradable": True
-                    }
-                }
-            ]
-    
-    # Grocery alternatives
-    elif category == "Grocery":
-        if "coffee" in product_name:
-            return [
-                {
-                    "id": "901234",
-                    "name": "Shade-Grown Bird Friendly Coffee",
-                    "ecoscore": 5,
-                    "price": "$9.99",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "Preserves bird habitats",
-                    "attributes": {
-                        "material": "Organic coffee",
-                        "packaging": "Compostable bag",
-                        "wildlifeImpact": "Positive",
-                        "certifications": ["Bird Friendly", "Organic"]
-                    }
-                },
-                {
-                    "id": "012567",
-                    "name": "Coffee Pod Refill System",
-                    "ecoscore": 4,
-                    "price": "$24.99 (starter kit)",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "Eliminates single-use pods",
-                    "attributes": {
-                        "material": "Stainless steel",
-                        "packaging": "None",
-                        "wasteReduction": "100% vs disposable pods",
-                        "reusable": True
-                    }
-                }
-            ]
-        elif "honey" in product_name:
-            return [
-                {
-                    "id": "123890",
-                    "name": "Local Raw Honey in Mason Jar",
-                    "ecoscore": 5,
-                    "price": "$8.99",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "Supports local beekeepers",
-                    "attributes": {
-                        "material": "Raw honey",
-                        "packaging": "Reusable glass jar",
-                        "foodMiles": "<50 miles",
-                        "reusable": True
-                    }
-                }
-            ]
-    
-    # Kitchen alternatives
-    elif category == "Kitchen":
-        if "container" in product_name:
-            return [
-                {
-                    "id": "234901",
-                    "name": "Glass Food Storage Set",
-                    "ecoscore": 5,
-                    "price": "$29.99 (5-piece set)",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "Non-toxic and endlessly reusable",
-                    "attributes": {
-                        "material": "Glass with bamboo lids",
-                        "packaging": "Recycled cardboard",
-                        "microwaveSafe": True,
-                        "freezerSafe": True
-                    }
-                },
-                {
-                    "id": "345012",
-                    "name": "Stainless Steel Lunch Box",
-                    "ecoscore": 5,
-                    "price": "$18.99",
-                    "image": "/api/placeholder/200/200",
-                    "improvement": "Unbreakable and durable",
-                    "attributes": {
-                        "material": "Stainless steel",
-                        "packaging": "None",
-                        "lifespan": "10+ years",
-                        "recyclable": True
-                    }
-                }
-            ]
-    
-    # Default alternatives (fallback)
-    return [
-        {
-            "id": "000001",
-            "name": "Eco-Friendly Alternative",
-            "ecoscore": 4,
-            "price": "$8.99",
-            "image": "/api/placeholder/200/200",
-            "improvement": "Better environmental profile",
-            "attributes": {
-                "material": "Sustainable alternative",
-                "packaging": "Eco-friendly",
-                "impact": "Reduced carbon footprint"
-            }
-        }
-    ]
+    for rule in seed["alternatives"]:
+        if rule["category"] == product["category"] and rule["keyword"] in product_name:
+            return rule["alternatives"]
+    return seed["defaultAlternatives"]
 
 def get_sustainability_tips(product):
     """Generate personalized sustainability tips for the product"""
@@ -648,6 +283,73 @@ def get_sustainability_tips(product):
     
     return tips
 
+# Catalog snapshots
+def load_catalog_seed():
+    """Read the seed products and alternative rules; only needed when publishing"""
+    with open(app.config['CATALOG_SEED']) as f:
+        return json.load(f)
+
+def build_catalog_records(products, seed):
+    """Flatten products and their precomputed alternatives into snapshot records"""
+    records = {"alternatives:default": seed["defaultAlternatives"]}
+    for barcode, product in products.items():
+        records[f"product:{barcode}"] = product
+        records[f"alternatives:{barcode}"] = get_alternatives(product, seed)
+    return records
+
+def pin_catalog():
+    """Keep one catalog version for the whole request, even if a new one is published"""
+    if 'catalog' not in g:
+        def seed_records():
+            seed = load_catalog_seed()
+            return build_catalog_records(seed["products"], seed)
+        version = catalog.ensure_published(seed_records)
+        if version is not None:
+            logger.info(f"Published initial catalog snapshot {version}")
+        g.catalog = catalog.snapshot()
+    return g.catalog
+
+@app.cli.command('publish-catalog')
+@click.argument('products_file', required=False)
+def publish_catalog_command(products_file):
+    """Publish a new catalog snapshot from a JSON file of {barcode: product}"""
+    seed = load_catalog_seed()
+    products = seed["products"]
+    if products_file:
+        with open(products_file) as f:
+            products = json.load(f)
+    version = catalog.publish(build_catalog_records(products, seed))
+    click.echo(f"Published catalog snapshot {version} with {len(products)} products")
+
+# Background jobs
+_background_lock = threading.Lock()
+_background_started = False
+
+def start_background_jobs():
+    """Create tables and start the flush and compaction threads once per process"""
+    global _background_started
+    # Hold the lock until the tables exist so concurrent first requests wait
+    # for them, and only mark the jobs started once everything succeeded so a
+    # failed init_db is retried on the next request
+    with _background_lock:
+        if _background_started:
+            return
+        init_db()
+        scan_timeseries.start_flusher(app.config['TIMESERIES_FLUSH_INTERVAL'])
+        scan_archive.start_compactor(app.config['SCAN_COMPACTION_INTERVAL'])
+        atexit.register(scan_timeseries.stop_flusher)
+        atexit.register(scan_archive.stop_compactor)
+        _background_started = True
+
+@app.before_request
+def ensure_background_jobs():
+    """Start background jobs on the first request, however the app was launched"""
+    if not _background_started:
+        try:
+            start_background_jobs()
+        except Exception as e:
+            logger.error(f"Failed to start background jobs: {e}")
+
 # API Routes
 @app.route('/')
 def home():
@@ -659,6 +361,12 @@ def home():
         "endpoints": [
             "/api/scan - POST - Upload barcode image",
             "/api/stats - GET - Get scanning statistics",
+            "/api/stats/timeseries - GET - Scans and EcoScore over time",
+            "/api/scans/history - GET - Per-day scan history",
+            "/api/stats/distribution - GET - EcoScore distribution",
+            "/api/stats/top-barcodes - GET - Most scanned barcodes",
+            "/api/leaderboard - GET - Users ranked by eco-points",
+            "/api/users/<id>/stats - GET - Eco-points and rank for one user",
             "/api/health - GET - Health check"
         ]
     })
@@ -679,34 +387,211 @@ def get_stats():
     """Get scanning statistics"""
     try:
         with get_db() as conn:
-            # Total scans
-            total_scans = conn.execute('SELECT COUNT(*) as count FROM scans').fetchone()['count']
-            
-            # Average ecoscore
-            avg_score = conn.execute('SELECT AVG(ecoscore) as avg FROM scans').fetchone()['avg'] or 0
+            # Live partitions
+            live = conn.execute(
+                f'SELECT COUNT(*) as count, COALESCE(SUM(ecoscore), 0) as total FROM scans WHERE {LIVE_SCANS_SQL}'
+            ).fetchone()
             
             # Top categories
-            categories = conn.execute('''
-                SELECT 
-                    CASE 
-                        WHEN product_name LIKE '%shampoo%' OR product_name LIKE '%brush%' THEN 'Beauty'
-                        WHEN product_name LIKE '%coffee%' OR product_name LIKE '%honey%' THEN 'Grocery'
-                        WHEN product_name LIKE '%detergent%' OR product_name LIKE '%sponge%' THEN 'Home'
-                        WHEN product_name LIKE '%razor%' OR product_name LIKE '%towel%' THEN 'Personal Care'
-                        ELSE 'Kitchen'
-                    END as category,
-                    COUNT(*) as count
+            categories = conn.execute(f'''
+                SELECT {SCAN_CATEGORY_SQL} as category, COUNT(*) as count
                 FROM scans 
+                WHERE {LIVE_SCANS_SQL}
                 GROUP BY category 
-                ORDER BY count DESC
             ''').fetchall()
-            
-            return jsonify({
-                "totalScans": total_scans,
-                "averageEcoScore": round(avg_score, 2),
-                "categories": [dict(row) for row in categories],
-                "timestamp": datetime.now().isoformat()
-            })
+        
+        # Archived partitions are summarised in the manifest
+        archived_scans, archived_sum, category_counts = scan_archive.totals()
+        for row in categories:
+            category_counts[row['category']] += row['count']
+        
+        total_scans = live['count'] + archived_scans
+        avg_score = (live['total'] + archived_sum) / total_scans if total_scans else 0
+        
+        return jsonify({
+            "totalScans": total_scans,
+            "averageEcoScore": round(avg_score, 2),
+            "categories": [
+                {"category": category, "count": count}
+                for category, count in category_counts.most_common()
+            ],
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/stats/timeseries')
+def get_stats_timeseries():
+    """Get scan counts and average EcoScore over time, e.g. ?window=6h&step=5m"""
+    try:
+        window = parse_duration(request.args.get('window', '1h'))
+        step = parse_duration(request.args.get('step', '1m'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if window > MAX_WINDOW:
+        return jsonify({"error": "window is limited to 366d"}), 400
+    if step > window:
+        return jsonify({"error": "step must not be larger than window"}), 400
+    if window // step > 1440:
+        return jsonify({"error": "Too many points requested. Use a larger step."}), 400
+
+    try:
+        points = scan_timeseries.query(window, step)
+        return jsonify({
+            "window": request.args.get('window', '1h'),
+            "step": request.args.get('step', '1m'),
+            "points": points,
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def analytics_window():
+    """Parse ?window=... into a [start, end) unix-time range; 'all' means no bound"""
+    window = request.args.get('window', '7d')
+    if window == 'all':
+        return None, None
+    end = int(datetime.now().timestamp()) + 1
+    return end - parse_duration(window) * 60, end
+
+@app.route('/api/stats/distribution')
+def get_ecoscore_distribution():
+    """Get EcoScore distribution, optionally per week or category, e.g. ?window=30d&groupBy=week"""
+    group = request.args.get('groupBy')
+    if group not in (None, 'week', 'category'):
+        return jsonify({"error": "groupBy must be 'week' or 'category'"}), 400
+    try:
+        start, end = analytics_window()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        if group:
+            distribution = scan_columns.histogram_by(group, start, end)
+        else:
+            distribution = scan_columns.histogram(start, end)
+        return jsonify({
+            "window": request.args.get('window', '7d'),
+            "groupBy": group,
+            "distribution": distribution,
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/stats/top-barcodes')
+def get_top_barcodes():
+    """Get the most scanned barcodes, e.g. ?window=30d&limit=100"""
+    try:
+        start, end = analytics_window()
+        limit = int(request.args.get('limit', 100))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not 1 <= limit <= 1000:
+        return jsonify({"error": "limit must be between 1 and 1000"}), 400
+    
+    try:
+        pin_catalog()
+        top = scan_columns.top_barcodes(limit, start, end)
+        return jsonify({
+            "window": request.args.get('window', '7d'),
+            "barcodes": [
+                {"barcode": barcode, "name": (g.catalog.product(barcode) or {}).get("name"), "count": count}
+                for barcode, count in top
+            ],
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/leaderboard')
+def get_leaderboard():
+    """Get users ranked by eco-points, e.g. ?limit=20&cursor=..."""
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if not 1 <= limit <= 100:
+        return jsonify({"error": "limit must be between 1 and 100"}), 400
+    
+    try:
+        entries, next_cursor = leaderboard.page(limit, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({
+        "entries": entries,
+        "nextCursor": next_cursor,
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/users/<user_id>/stats')
+def get_user_stats(user_id):
+    """Get eco-points and rank for a user; 'me' resolves to the caller"""
+    if user_id == 'me':
+        user_id = leaderboard.user_id(request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr))
+    try:
+        stats = leaderboard.user(user_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if stats is None:
+        return jsonify({"error": "User not found"}), 404
+    return jsonify(stats)
+
+@app.route('/api/scans/history')
+def get_scan_history():
+    """Get per-day scan summaries, e.g. ?start=2024-01-01&end=2024-01-31&barcode=...
+
+    Archived days are read straight from their archive files, newer days from
+    the live scans table.
+    """
+    try:
+        end_day = date.fromisoformat(request.args.get('end', utc_today().isoformat()))
+        start_day = date.fromisoformat(request.args.get('start', (end_day - timedelta(days=6)).isoformat()))
+    except ValueError:
+        return jsonify({"error": "Dates must be in YYYY-MM-DD format"}), 400
+    if start_day > end_day:
+        return jsonify({"error": "start must not be after end"}), 400
+    if (end_day - start_day).days > 366:
+        return jsonify({"error": "History window is limited to one year"}), 400
+    barcode = request.args.get('barcode')
+    
+    try:
+        archived = scan_archive.archived_days(start_day, end_day)
+        days = []
+        day = start_day
+        with get_db() as conn:
+            while day <= end_day:
+                if day in archived:
+                    columns = scan_archive.read_partition(day)
+                    scores = columns['ecoscore']
+                    if barcode:
+                        scores = scores[columns['barcode'] == barcode]
+                    count, total, source = len(scores), int(scores.sum()), "archive"
+                else:
+                    start, end = partition_bounds(day)
+                    query = 'SELECT COUNT(*) as count, COALESCE(SUM(ecoscore), 0) as total FROM scans WHERE timestamp >= ? AND timestamp < ?'
+                    params = [start, end]
+                    if barcode:
+                        query += ' AND barcode = ?'
+                        params.append(barcode)
+                    row = conn.execute(query, params).fetchone()
+                    count, total, source = row['count'], row['total'], "live"
+                days.append({
+                    "day": day.isoformat(),
+                    "scans": count,
+                    "averageEcoScore": round(total / count, 2) if count else None,
+                    "source": source
+                })
+                day += timedelta(days=1)
+        
+        return jsonify({
+            "start": start_day.isoformat(),
+            "end": end_day.isoformat(),
+            "barcode": barcode,
+            "days": days
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -725,6 +610,7 @@ def handle_scan():
     
     filepath = None
     try:
+        pin_catalog()
         filename = secure_filename(file.filename)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{timestamp}_{filename}"
@@ -735,11 +621,12 @@ def handle_scan():
         
         barcode = scan_barcode(filepath)
         if not barcode:
+            scan_timeseries.record_failure()
             return jsonify({"error": "No barcode detected. Try a clearer image with better lighting."}), 400
         
         logger.info(f"Detected barcode: {barcode}")
         
-        product = MOCK_PRODUCTS.get(barcode, {
+        product = g.catalog.product(barcode) or {
             "itemId": "0",
             "name": "Generic Product",
             "category": "Miscellaneous",
@@ -747,13 +634,13 @@ def handle_scan():
             "image": "/api/placeholder/300/300",
             "description": "Product not found in database",
             "attributes": {"material": "Unknown", "packaging": "Unknown"}
-        })
+        }
         
         ecoscore = generate_ecoscore(product)
         packaging = "Recyclable" if product["attributes"].get("recyclable", False) else "Non-recyclable"
         carbon_impact = "Low" if ecoscore >= 3 else "High"
         
-        alternatives = get_alternatives(product)
+        alternatives = g.catalog.alternatives(barcode) or g.catalog.get("alternatives:default")
         sustainability_tips = get_sustainability_tips(product)
         
         product.update({
@@ -767,6 +654,11 @@ def handle_scan():
         # Log scan for analytics
         user_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
         log_scan(barcode, product["name"], ecoscore, user_ip)
+        scan_timeseries.record_scan(ecoscore, product["category"])
+        try:
+            scan_columns.append(barcode, ecoscore, product["category"])
+        except Exception as e:
+            logger.error(f"Column store append error: {e}")
         
         logger.info(f"Scan successful: {product['name']} (EcoScore: {ecoscore})")
         
@@ -780,6 +672,7 @@ def handle_scan():
         
     except Exception as e:
         logger.error(f"Scan error: {str(e)}")
+        scan_timeseries.record_failure()
         return jsonify({"error": f"Processing failed: {str(e)}"}), 500
     finally:
         if filepath and os.path.exists(filepath):
@@ -790,8 +683,20 @@ def handle_scan():
 
 @app.route('/api/placeholder/<int:width>/<int:height>')
 def placeholder_image(width, height):
-    """Generate placeholder image URLs"""
-    return f"https://via.placeholder.com/{width}x{height}/4ade80/ffffff?text=EcoProduct"
+    """Render a placeholder PNG, e.g. /api/placeholder/200/200?bg=4ade80&fg=ffffff"""
+    try:
+        background = parse_color(request.args.get('bg'), DEFAULT_BACKGROUND)
+        foreground = parse_color(request.args.get('fg'), DEFAULT_FOREGROUND)
+        image = placeholders.get(width, height, background, foreground)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    response = make_response(image)
+    response.mimetype = 'image/png'
+    # The URL fully determines the image, so it never needs revalidating
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.add_etag()
+    return response.make_conditional(request)
 
 # Error handlers
 @app.errorhandler(413)
@@ -807,7 +712,7 @@ def not_found(e):
     return jsonify({"error": "Endpoint not found"}), 404
 
 if __name__ == '__main__':
-    init_db()
+    start_background_jobs()
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
     app.run(debug=debug, host='0.0.0.0', port=port)
@@ -0,0 +1,207 @@
+"""Versioned, memory-mapped binary catalog snapshots shared across workers.
+
+Snapshot layout (little-endian)::
+
+    header  magic[8] version:u64 count:u32 reserved:u32
+    index   count x (key_offset:u32 key_length:u32 value_offset:u32 value_length:u32), sorted by key
+    data    UTF-8 keys and compact JSON values
+
+The ``CURRENT`` file names the active snapshot and is swapped with an atomic
+rename, so workers pick up a new version without restarting while requests
+that already hold the previous snapshot keep reading it.
+"""
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b'ECOCAT01'
+HEADER = struct.Struct('<8sQII')
+ENTRY = struct.Struct('<IIII')
+POINTER = 'CURRENT'
+KEEP_VERSIONS = 3
+
+
+class CatalogError(Exception):
+    """Raised for missing or corrupt snapshots"""
+
+
+class CatalogSnapshot:
+    """Read-only view of one snapshot file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            raise CatalogError(f"Truncated catalog snapshot: {path}")
+        magic, self.version, self.count, _ = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise CatalogError(f"Not a catalog snapshot: {path}")
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self._mmap, HEADER.size + i * ENTRY.size)
+
+    def _find(self, key):
+        """Binary search the sorted index for ``key``"""
+        key = key.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_offset, key_length, value_offset, value_length = self._entry(mid)
+            probe = self._mmap[key_offset:key_offset + key_length]
+            if probe == key:
+                return value_offset, value_length
+            if probe < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def get(self, key, default=None):
+        """Decode the record stored under ``key`` into a fresh object"""
+        found = self._find(key)
+        if found is None:
+            return default
+        value_offset, value_length = found
+        return json.loads(self._mmap[value_offset:value_offset + value_length])
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def keys(self):
+        for i in range(self.count):
+            key_offset, key_length, _, _ = self._entry(i)
+            yield self._mmap[key_offset:key_offset + key_length].decode('utf-8')
+
+    def product(self, barcode):
+        return self.get(f"product:{barcode}")
+
+    def alternatives(self, barcode):
+        return self.get(f"alternatives:{barcode}")
+
+
+def write_snapshot(path, records, version):
+    """Serialise ``records`` ({key: JSON-serialisable value}) into a snapshot file"""
+    items = sorted((key.encode('utf-8'), json.dumps(value, separators=(',', ':')).encode('utf-8'))
+                   for key, value in records.items())
+    offset = HEADER.size + len(items) * ENTRY.size
+    index, data = [], []
+    for key, value in items:
+        index.append(ENTRY.pack(offset, len(key), offset + len(key), len(value)))
+        data.append(key)
+        data.append(value)
+        offset += len(key) + len(value)
+
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, version, len(items), 0))
+        f.writelines(index)
+        f.writelines(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Catalog:
+    """Tracks the current snapshot in a directory and hot-swaps new versions"""
+
+    def __init__(self, directory, check_interval=1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._pointer_stat = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def pointer_path(self):
+        return os.path.join(self.directory, POINTER)
+
+    def exists(self):
+        return os.path.exists(self.pointer_path)
+
+    def publish(self, records):
+        """Write a new snapshot version and make it current; returns the version"""
+        version = time.time_ns()
+        filename = f"catalog-{version}.bin"
+        write_snapshot(os.path.join(self.directory, filename), records, version)
+
+        tmp_pointer = f"{self.pointer_path}.tmp.{os.getpid()}"
+        with open(tmp_pointer, 'w') as f:
+            f.write(filename)
+        os.replace(tmp_pointer, self.pointer_path)
+        self._prune(filename)
+        return version
+
+    def ensure_published(self, build_records):
+        """Publish ``build_records()`` if nothing is published yet; returns the version or None.
+
+        Workers race to bootstrap on their first request, so the check is
+        repeated under a file lock and only one of them publishes.
+        """
+        if self.exists():
+            return None
+        with open(os.path.join(self.directory, '.publish.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if self.exists():
+                    return None
+                return self.publish(build_records())
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _prune(self, current):
+        """Remove old versions; workers still mapping them keep their pages"""
+        versions = sorted(name for name in os.listdir(self.directory)
+                          if name.startswith('catalog-') and name.endswith('.bin'))
+        for name in versions[:-KEEP_VERSIONS]:
+            if name != current:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def snapshot(self):
+        """Return the current snapshot, reloading if a new version was published"""
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            self._checked_at = now
+            try:
+                stat = os.stat(self.pointer_path)
+            except FileNotFoundError:
+                if self._snapshot is None:
+                    raise CatalogError(f"No catalog published in {self.directory}")
+                return self._snapshot
+            pointer_stat = (stat.st_ino, stat.st_mtime_ns)
+            if self._snapshot is None or pointer_stat != self._pointer_stat:
+                snapshot = self._open_current()
+                if snapshot is None:
+                    if self._snapshot is None:
+                        raise CatalogError(f"Catalog in {self.directory} kept changing while opening it")
+                    # Keep serving the previous version; the next check retries
+                    return self._snapshot
+                self._snapshot = snapshot
+                self._pointer_stat = pointer_stat
+            return self._snapshot
+
+    def _open_current(self, attempts=3):
+        """Open the snapshot named by the pointer, or None if it keeps being pruned.
+
+        Several publishes can land between reading the pointer and opening the
+        file it names, so the pointer is re-read when the file has gone.
+        """
+        for _ in range(attempts):
+            with open(self.pointer_path) as f:
+                filename = f.read().strip()
+            try:
+                return CatalogSnapshot(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                continue
+        return None
@@ -0,0 +1,194 @@
+"""Append-only, memory-mapped columnar store of scan events for NumPy analytics"""
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Column name -> fixed-width dtype; one raw little-endian file per column
+COLUMNS = {
+    'timestamp': np.dtype('<i8'),
+    'barcode': np.dtype('<i4'),
+    'ecoscore': np.dtype('<i1'),
+    'category': np.dtype('<i2'),
+}
+
+WEEK_SECONDS = 7 * 86400
+# The unix epoch was a Thursday; shift so weeks start on Monday
+WEEK_OFFSET = 3 * 86400
+MAX_ECOSCORE = 5
+
+
+class _Dictionary:
+    """String interning table persisted as one value per line"""
+
+    def __init__(self, path):
+        self.path = path
+        self.values = []
+        self.ids = {}
+        self._size = 0
+        # Readers refresh from lookup() while a writer refreshes from intern();
+        # reading the same tail twice would append duplicate values and shift ids
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Pick up values appended by other processes"""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'rb') as f:
+                f.seek(self._size)
+                data = f.read()
+            # Only consume complete lines. Split on b'\n' alone: intern() only
+            # escapes '\n', and decoded barcodes may contain '\r', '\x1e' or
+            # other characters str.splitlines() also treats as line breaks
+            data = data[:data.rfind(b'\n') + 1]
+            for line in data.split(b'\n')[:-1]:
+                value = line.decode('utf-8')
+                self.ids[value] = len(self.values)
+                self.values.append(value)
+            self._size += len(data)
+
+    def intern(self, value):
+        """Return the id for ``value``, appending it if new (caller holds the write lock)"""
+        value = value.replace('\n', ' ')
+        if value not in self.ids:
+            self.refresh()
+        if value not in self.ids:
+            with open(self.path, 'ab') as f:
+                f.write(value.encode('utf-8') + b'\n')
+            self.refresh()
+        return self.ids[value]
+
+    def lookup(self, ident):
+        if ident >= len(self.values):
+            self.refresh()
+        return self.values[ident]
+
+
+class ColumnStore:
+    """Scan events stored as fixed-width column files.
+
+    Appends are serialised with a file lock so several worker processes can
+    write to the same store. Readers memory-map the columns and only look at
+    rows that are complete in every column. Timestamps are kept non-decreasing
+    so time windows are found by binary search instead of a full scan.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.barcodes = _Dictionary(os.path.join(path, 'barcodes.txt'))
+        self.categories = _Dictionary(os.path.join(path, 'categories.txt'))
+        self._lock = threading.Lock()
+        self._lock_path = os.path.join(path, '.lock')
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock, open(self._lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __len__(self):
+        """Number of rows present in every column"""
+        sizes = []
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            sizes.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        return min(sizes)
+
+    # Writes
+    def append(self, barcode, ecoscore, category, now=None):
+        """Append one scan event"""
+        with self._write_lock():
+            rows = len(self)
+            # Drop any torn tail left by a crashed writer before appending
+            for name, dtype in COLUMNS.items():
+                path = self._column_path(name)
+                if os.path.exists(path) and os.path.getsize(path) != rows * dtype.itemsize:
+                    os.truncate(path, rows * dtype.itemsize)
+
+            timestamp = int(time.time() if now is None else now)
+            if rows:
+                last = self._map('timestamp', rows)[-1]
+                timestamp = max(timestamp, int(last))
+
+            values = {
+                'timestamp': timestamp,
+                'barcode': self.barcodes.intern(barcode or ''),
+                'ecoscore': ecoscore,
+                'category': self.categories.intern(category or 'Unknown'),
+            }
+            for name, dtype in COLUMNS.items():
+                with open(self._column_path(name), 'ab') as f:
+                    f.write(np.array([values[name]], dtype=dtype).tobytes())
+
+    # Reads
+    def _map(self, name, rows):
+        return np.memmap(self._column_path(name), dtype=COLUMNS[name], mode='r', shape=(rows,))
+
+    def window(self, start=None, end=None):
+        """Memory-mapped column slices for events with start <= timestamp < end"""
+        rows = len(self)
+        if rows == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        timestamps = self._map('timestamp', rows)
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = rows if end is None else int(np.searchsorted(timestamps, end, side='left'))
+        return {name: self._map(name, rows)[lo:hi] for name in COLUMNS}
+
+    def histogram(self, start=None, end=None):
+        """EcoScore distribution as {score: count}"""
+        scores = self.window(start, end)['ecoscore']
+        counts = np.bincount(scores, minlength=MAX_ECOSCORE + 1)
+        return {score: int(counts[score]) for score in range(1, len(counts)) if counts[score]}
+
+    def histogram_by(self, group, start=None, end=None):
+        """EcoScore distribution per week or per category"""
+        cols = self.window(start, end)
+        scores = cols['ecoscore'].astype(np.int64)
+        if group == 'week':
+            keys = (cols['timestamp'] + WEEK_OFFSET) // WEEK_SECONDS
+        elif group == 'category':
+            keys = cols['category'].astype(np.int64)
+        else:
+            raise ValueError(f"Unknown group: {group!r}")
+        if len(keys) == 0:
+            return {}
+
+        # Keys are dense (consecutive weeks, small category ids) so a single
+        # bincount over key * width + score replaces a sort-based group-by
+        width = MAX_ECOSCORE + 1
+        base = int(keys.min())
+        span = int(keys.max()) - base + 1
+        counts = np.bincount((keys - base) * width + scores, minlength=span * width)
+        counts = counts.reshape(span, width)
+
+        result = {}
+        for offset in np.flatnonzero(counts.any(axis=1)):
+            key, row = base + offset, counts[offset]
+            if group == 'week':
+                label = time.strftime('%Y-%m-%d', time.gmtime(int(key) * WEEK_SECONDS - WEEK_OFFSET))
+            else:
+                label = self.categories.lookup(int(key))
+            result[label] = {score: int(row[score]) for score in range(1, width) if row[score]}
+        return result
+
+    def top_barcodes(self, limit=100, start=None, end=None):
+        """Most scanned barcodes as [(barcode, count)]"""
+        ids = self.window(start, end)['barcode']
+        if len(ids) == 0:
+            return []
+        counts = np.bincount(ids)
+        limit = min(limit, np.count_nonzero(counts))
+        top = np.argpartition(counts, -limit)[-limit:]
+        top = top[np.argsort(counts[top])[::-1]]
+        return [(self.barcodes.lookup(int(i)), int(counts[i])) for i in top]
@@ -0,0 +1,207 @@
+"""In-memory ranked index of user eco-points"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, insort
+from contextlib import closing
+
+
+def load_secret(path):
+    """Read the server secret for user ids, creating it on first use.
+
+    The file is created with an atomic link so concurrent workers all end up
+    with the same secret.
+    """
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            f.write(secrets.token_hex(32))
+        os.chmod(tmp_path, 0o600)
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(path) as f:
+        return f.read().strip()
+
+
+def user_id_for(user_ip, secret):
+    """Opaque public id for a user.
+
+    Keyed with a server secret: a plain hash of an IPv4 address can be
+    reversed by hashing all 2**32 addresses.
+    """
+    return hmac.new(secret.encode('utf-8'), (user_ip or '').encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+
+
+def encode_cursor(points, user_id):
+    return base64.urlsafe_b64encode(json.dumps([points, user_id]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        points, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return int(points), str(user_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class Leaderboard:
+    """Users ordered by eco-points, highest first.
+
+    Entries live in a sorted list of (-points, user_id) keys, so rank lookups,
+    top-K and cursor seeks are binary searches. The list is loaded once from
+    the ``user_stats`` points index and kept current by :meth:`update`, which
+    the scan writer calls after each commit. Writes from other processes are
+    picked up at most every ``sync_interval`` seconds by reading only the rows
+    whose ``last_scan`` moved since the previous sync.
+    """
+
+    def __init__(self, db_path, secret, cache_size=100, sync_interval=30):
+        self.db_path = db_path
+        self.secret = secret
+        self.cache_size = cache_size
+        self.sync_interval = sync_interval
+        self._keys = []
+        self._users = {}  # user_id -> {"ecoPoints", "totalScans", "lastScan"}
+        self._top_cache = None
+        self._loaded_at = None
+        self._synced_through = None  # newest last_scan read from the database
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+
+    def _read_rows(self, since=None):
+        """(user_id, eco_points, total_scans, last_scan) rows, hashed outside the index lock"""
+        query = 'SELECT user_ip, eco_points, total_scans, last_scan FROM user_stats'
+        params = ()
+        if since is not None:
+            query += ' WHERE last_scan >= ?'
+            params = (since,)
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [(self.user_id(user_ip), eco_points, total_scans, last_scan)
+                for user_ip, eco_points, total_scans, last_scan in rows]
+
+    def load(self):
+        """Rebuild the index from the database"""
+        rows = self._read_rows()
+        keys = sorted((-eco_points, user_id) for user_id, eco_points, _, _ in rows)
+        users = {user_id: {"ecoPoints": eco_points, "totalScans": total_scans, "lastScan": last_scan}
+                 for user_id, eco_points, total_scans, last_scan in rows}
+        synced_through = max((row[3] for row in rows if row[3] is not None), default=None)
+        with self._lock:
+            self._keys = keys
+            self._users = users
+            self._top_cache = None
+            self._synced_through = synced_through
+            self._loaded_at = time.monotonic()
+
+    def sync(self):
+        """Apply rows changed by other processes since the last load or sync"""
+        rows = self._read_rows(self._synced_through)
+        with self._lock:
+            for user_id, eco_points, total_scans, last_scan in rows:
+                previous = self._users.get(user_id)
+                # update() may already hold newer totals than this read
+                if previous is None or total_scans >= previous["totalScans"]:
+                    self._set(user_id, eco_points, total_scans, last_scan)
+                if last_scan is not None and (self._synced_through is None or last_scan > self._synced_through):
+                    self._synced_through = last_scan
+            self._loaded_at = time.monotonic()
+
+    def user_id(self, user_ip):
+        return user_id_for(user_ip, self.secret)
+
+    def _ensure_fresh(self):
+        """Load or sync without holding the index lock, so update() is never blocked by a read"""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.sync_interval:
+            return
+        if self._loaded_at is None:
+            with self._sync_lock:
+                if self._loaded_at is None:
+                    self.load()
+            return
+        # One thread syncs; the others keep serving the current index
+        if self._sync_lock.acquire(blocking=False):
+            try:
+                self.sync()
+            finally:
+                self._sync_lock.release()
+
+    def update(self, user_ip, eco_points, total_scans, last_scan=None):
+        """Record a user's new totals after the writer has committed them"""
+        user_id = self.user_id(user_ip)
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._set(user_id, eco_points, total_scans, last_scan)
+
+    def _set(self, user_id, eco_points, total_scans, last_scan):
+        """Move one user to their new position (caller holds the lock)"""
+        previous = self._users.get(user_id)
+        if previous is not None:
+            old_key = (-previous["ecoPoints"], user_id)
+            i = bisect_left(self._keys, old_key)
+            if i < len(self._keys) and self._keys[i] == old_key:
+                del self._keys[i]
+        new_key = (-eco_points, user_id)
+        insort(self._keys, new_key)
+        self._users[user_id] = {"ecoPoints": eco_points, "totalScans": total_scans, "lastScan": last_scan}
+        # Only drop the cached top-K if this user is or could now be in it
+        if self._top_cache is not None:
+            cutoff = self._top_cache[-1] if len(self._top_cache) >= self.cache_size else None
+            if cutoff is None or new_key <= cutoff or any(key[1] == user_id for key in self._top_cache):
+                self._top_cache = None
+
+    def _entry(self, key):
+        points, user_id = -key[0], key[1]
+        stats = self._users[user_id]
+        return {
+            "userId": user_id,
+            "rank": bisect_left(self._keys, (-points, '')) + 1,
+            "ecoPoints": points,
+            "totalScans": stats["totalScans"],
+            "lastScan": stats["lastScan"]
+        }
+
+    def page(self, limit, cursor=None):
+        """Return (entries, next_cursor) starting after ``cursor``"""
+        self._ensure_fresh()
+        with self._lock:
+            if cursor is None and limit <= self.cache_size:
+                if self._top_cache is None:
+                    self._top_cache = self._keys[:self.cache_size]
+                keys = self._top_cache[:limit]
+                start = 0
+            else:
+                start = 0
+                if cursor is not None:
+                    points, user_id = decode_cursor(cursor)
+                    start = bisect_left(self._keys, (-points, user_id))
+                    if start < len(self._keys) and self._keys[start] == (-points, user_id):
+                        start += 1
+                keys = self._keys[start:start + limit]
+            entries = [self._entry(key) for key in keys]
+            next_cursor = None
+            if keys and start + len(keys) < len(self._keys):
+                next_cursor = encode_cursor(-keys[-1][0], keys[-1][1])
+            return entries, next_cursor
+
+    def user(self, user_id):
+        """Stats and rank for one user, or None if unknown"""
+        self._ensure_fresh()
+        with self._lock:
+            stats = self._users.get(user_id)
+            if stats is None:
+                return None
+            entry = self._entry((-stats["ecoPoints"], user_id))
+            entry["totalUsers"] = len(self._keys)
+            return entry
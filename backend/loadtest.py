@@ -0,0 +1,341 @@
+"""Open-loop load generator for the EcoScore backend.
+
+Replays a mix of scan uploads (multipart, like app/api/proxy-scan), barcode
+lookups and stats polls against a running server at a fixed Poisson arrival
+rate, independent of how fast the server answers. Latency is measured from
+each request's scheduled start, so queueing delay on an overloaded server is
+included rather than hidden.
+
+Usage:
+    python loadtest.py --url http://localhost:5000 --rates 5,10,20,40 --duration 30
+    python loadtest.py --rates 20 --save-baseline baseline.json
+    python loadtest.py --rates 20 --baseline baseline.json
+"""
+import argparse
+import io
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw
+
+CATALOG_SEED = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog_seed.json')
+
+
+def load_catalog_barcodes(path=CATALOG_SEED):
+    """Barcodes of the seed products, rendered literally so scans hit the catalog"""
+    with open(path) as f:
+        return list(json.load(f)["products"])
+
+
+CATALOG_BARCODES = load_catalog_barcodes()
+
+DEFAULT_MIX = "scan=0.2,lookup=0.4,stats=0.4"
+
+# Code 128 symbol widths (bar, space, bar, space, bar, space) for values 0-106
+_CODE128_WIDTHS = [
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312", "132212", "221213",
+    "221312", "231212", "112232", "122132", "122231", "113222", "123122", "123221", "223211", "221132",
+    "221231", "213212", "223112", "312131", "311222", "321122", "321221", "312212", "322112", "322211",
+    "212123", "212321", "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121", "313121", "211331",
+    "231131", "213113", "213311", "213131", "311123", "311321", "331121", "312113", "312311", "332111",
+    "314111", "221411", "431111", "111224", "111422", "121124", "121421", "141122", "141221", "112214",
+    "112412", "122114", "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112", "421211", "212141",
+    "214121", "412121", "111143", "111341", "131141", "114113", "114311", "411113", "411311", "113141",
+    "114131", "311141", "411131", "211412", "211214", "211232", "2331112"
+]
+_CODE128_START_B = 104
+_CODE128_STOP = 106
+
+
+def code128_modules(payload):
+    """Bar pattern ('1' = bar) encoding ``payload`` literally in Code 128 set B"""
+    values = [_CODE128_START_B] + [ord(char) - 32 for char in payload]
+    if any(not 0 <= value <= 95 for value in values[1:]):
+        raise ValueError(f"Code 128 set B cannot encode {payload!r}")
+    checksum = (values[0] + sum(i * value for i, value in enumerate(values[1:], start=1))) % 103
+    bits = ""
+    for value in values + [checksum, _CODE128_STOP]:
+        for i, width in enumerate(_CODE128_WIDTHS[value]):
+            bits += ("1" if i % 2 == 0 else "0") * int(width)
+    return bits
+
+
+def barcode_image(payload, module_width=3, height=120, noise=0):
+    """Render a synthetic Code 128 barcode photo of ``payload`` as PNG bytes"""
+    modules = code128_modules(payload)
+    quiet = 10 * module_width
+    width = len(modules) * module_width + 2 * quiet
+    image = Image.new("L", (width, height + 2 * quiet), 255)
+    draw = ImageDraw.Draw(image)
+    for i, bit in enumerate(modules):
+        if bit == "1":
+            x = quiet + i * module_width
+            draw.rectangle([x, quiet, x + module_width - 1, quiet + height], fill=0)
+    if noise:
+        pixels = image.load()
+        rng = random.Random(payload)
+        for _ in range(noise):
+            pixels[rng.randrange(image.width), rng.randrange(image.height)] = rng.randrange(256)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def multipart_body(field, filename, data, content_type="image/png"):
+    boundary = uuid.uuid4().hex
+    body = b"".join([
+        f"--{boundary}\r\n".encode(),
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'.encode(),
+        f"Content-Type: {content_type}\r\n\r\n".encode(),
+        data,
+        f"\r\n--{boundary}--\r\n".encode(),
+    ])
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class Workload:
+    """Builds requests for each endpoint kind"""
+
+    def __init__(self, base_url, images=16, seed=0):
+        self.base_url = base_url.rstrip("/")
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.images = [barcode_image(CATALOG_BARCODES[i % len(CATALOG_BARCODES)], noise=i * 50)
+                       for i in range(images)]
+
+    def _choice(self, seq):
+        with self.lock:
+            return self.rng.choice(seq)
+
+    def request(self, kind):
+        """Return (endpoint label, urllib Request)"""
+        if kind == "scan":
+            body, content_type = multipart_body("image", "scan.png", self._choice(self.images))
+            return "POST /api/scan", urllib.request.Request(
+                f"{self.base_url}/api/scan", data=body, headers={"Content-Type": content_type}, method="POST")
+        if kind == "lookup":
+            barcode = self._choice(CATALOG_BARCODES)
+            return "GET /api/scans/history", urllib.request.Request(
+                f"{self.base_url}/api/scans/history?barcode={barcode}")
+        if kind == "stats":
+            path = self._choice(["/api/stats", "/api/stats/timeseries?window=1h&step=1m", "/api/leaderboard"])
+            return f"GET {path.split('?')[0]}", urllib.request.Request(f"{self.base_url}{path}")
+        raise ValueError(f"Unknown request kind: {kind!r}")
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        mix[kind.strip()] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Mix weights must add up to more than zero")
+    return {kind: weight / total for kind, weight in mix.items()}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_step(workload, mix, rate, duration, timeout, max_in_flight, seed):
+    """Offer ``rate`` requests/second for ``duration`` seconds; return per-endpoint results"""
+    rng = random.Random(seed)
+    kinds, weights = list(mix), list(mix.values())
+    results = defaultdict(list)  # endpoint -> [(latency_seconds, ok)]
+    results_lock = threading.Lock()
+    dropped = defaultdict(int)
+    in_flight = threading.Semaphore(max_in_flight)
+
+    def fire(scheduled, endpoint, req):
+        try:
+            ok = True
+            try:
+                with urllib.request.urlopen(req, timeout=timeout) as response:
+                    response.read()
+                    ok = response.status < 500
+            except urllib.error.HTTPError as e:
+                # 4xx (e.g. no barcode detected) is a valid answer, 5xx is not
+                ok = e.code < 500
+            except Exception:
+                ok = False
+            with results_lock:
+                results[endpoint].append((time.perf_counter() - scheduled, ok))
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        start = time.perf_counter()
+        next_at = start
+        while True:
+            next_at += rng.expovariate(rate)
+            if next_at - start >= duration:
+                break
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            endpoint, req = workload.request(rng.choices(kinds, weights)[0])
+            # Open loop: never wait for a slot; count it as dropped instead
+            if not in_flight.acquire(blocking=False):
+                dropped[endpoint] += 1
+                continue
+            pool.submit(fire, next_at, endpoint, req)
+    # Measured after the pool has drained, so requests that finish after the
+    # last arrival do not inflate throughput
+    elapsed = max(time.perf_counter() - start, duration)
+
+    report = {}
+    for endpoint in sorted(set(results) | set(dropped)):
+        samples = results.get(endpoint, [])
+        latencies = sorted(latency for latency, _ in samples)
+        errors = sum(1 for _, ok in samples if not ok) + dropped[endpoint]
+        attempted = len(samples) + dropped[endpoint]
+        report[endpoint] = {
+            "offered": attempted,
+            "completed": len(samples),
+            "throughput": round((len(samples) - (errors - dropped[endpoint])) / elapsed, 2),
+            "errorRate": round(errors / attempted, 4) if attempted else 0.0,
+            "p50Ms": _ms(percentile(latencies, 50)),
+            "p90Ms": _ms(percentile(latencies, 90)),
+            "p99Ms": _ms(percentile(latencies, 99)),
+            "maxMs": _ms(latencies[-1] if latencies else None),
+        }
+    return report
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def saturation_points(steps, slo_ms, max_error_rate):
+    """First offered rate at which each endpoint breaks its p99 SLO or error budget"""
+    saturation = {}
+    for step in steps:
+        for endpoint, stats in step["endpoints"].items():
+            if endpoint in saturation:
+                continue
+            if (stats["p99Ms"] is not None and stats["p99Ms"] > slo_ms) or stats["errorRate"] > max_error_rate:
+                saturation[endpoint] = step["rate"]
+    return saturation
+
+
+def compare(current, baseline, tolerance, min_delta_ms, max_error_rate):
+    """Return human-readable regressions of current vs baseline (same rate and endpoint).
+
+    Latency must worsen by more than ``tolerance`` and by at least
+    ``min_delta_ms`` so jitter on fast endpoints is not reported.
+    """
+    regressions = []
+    baseline_steps = {step["rate"]: step for step in baseline["steps"]}
+    for step in current["steps"]:
+        before = baseline_steps.get(step["rate"])
+        if before is None:
+            continue
+        for endpoint, stats in step["endpoints"].items():
+            old = before["endpoints"].get(endpoint)
+            if old is None:
+                continue
+            if (old["p99Ms"] and stats["p99Ms"]
+                    and stats["p99Ms"] > old["p99Ms"] * (1 + tolerance)
+                    and stats["p99Ms"] - old["p99Ms"] >= min_delta_ms):
+                regressions.append(f"{endpoint} @ {step['rate']}/s: p99 {old['p99Ms']}ms -> {stats['p99Ms']}ms")
+            if old["throughput"] and stats["throughput"] < old["throughput"] * (1 - tolerance):
+                regressions.append(f"{endpoint} @ {step['rate']}/s: throughput "
+                                   f"{old['throughput']}/s -> {stats['throughput']}/s")
+            if stats["errorRate"] > old["errorRate"] + max_error_rate:
+                regressions.append(f"{endpoint} @ {step['rate']}/s: error rate "
+                                   f"{old['errorRate']:.2%} -> {stats['errorRate']:.2%}")
+    return regressions
+
+
+def print_report(result):
+    header = f"{'rate':>6}  {'endpoint':<28} {'offered':>7} {'ok/s':>7} {'err':>7} {'p50':>8} {'p90':>8} {'p99':>8}"
+    print(header)
+    print("-" * len(header))
+    for step in result["steps"]:
+        for endpoint, s in step["endpoints"].items():
+            print(f"{step['rate']:>6}  {endpoint:<28} {s['offered']:>7} {s['throughput']:>7} "
+                  f"{s['errorRate']:>7.2%} {_fmt(s['p50Ms']):>8} {_fmt(s['p90Ms']):>8} {_fmt(s['p99Ms']):>8}")
+    print()
+    if result["saturation"]:
+        for endpoint, rate in sorted(result["saturation"].items()):
+            print(f"saturated: {endpoint} at {rate} req/s")
+    else:
+        print("no endpoint saturated at the offered rates")
+
+
+def _fmt(ms):
+    return "-" if ms is None else f"{ms}ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Open-loop load test for the EcoScore backend")
+    parser.add_argument("--url", default="http://localhost:5000", help="Backend base URL")
+    parser.add_argument("--rates", default="5,10,20", help="Comma-separated arrival rates (req/s) to step through")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per rate step")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Workload weights, e.g. scan=0.2,lookup=0.4,stats=0.4")
+    parser.add_argument("--timeout", type=float, default=10, help="Per-request timeout in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Concurrent requests before arrivals are dropped")
+    parser.add_argument("--slo-ms", type=float, default=500, help="p99 latency that counts as saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate that counts as saturated")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare results against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression vs baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=5, help="Ignore p99 changes smaller than this")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    rates = [float(rate) for rate in args.rates.split(",")]
+    workload = Workload(args.url, seed=args.seed)
+
+    steps = []
+    for i, rate in enumerate(rates):
+        print(f"offering {rate} req/s for {args.duration}s...", file=sys.stderr)
+        endpoints = run_step(workload, mix, rate, args.duration, args.timeout, args.max_in_flight, args.seed + i)
+        steps.append({"rate": rate, "endpoints": endpoints})
+
+    result = {
+        "url": args.url,
+        "mix": mix,
+        "duration": args.duration,
+        "steps": steps,
+        "saturation": saturation_points(steps, args.slo_ms, args.max_error_rate),
+    }
+    print_report(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance, args.min_delta_ms, args.max_error_rate)
+        if regressions:
+            print("regressions vs baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("no regressions vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Locally rendered placeholder images with a bounded LRU cache"""
+import io
+import re
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw, ImageFont
+
+DEFAULT_BACKGROUND = '4ade80'
+DEFAULT_FOREGROUND = 'ffffff'
+DEFAULT_TEXT = 'EcoProduct'
+MAX_DIMENSION = 1200
+# Sizes referenced by the catalog seed
+COMMON_SIZES = [(200, 200), (300, 300)]
+
+_HEX_COLOR = re.compile(r'^[0-9a-fA-F]{6}$')
+
+
+def parse_color(value, default):
+    """Validate a 6-digit hex color (without '#')"""
+    value = (value or default).lstrip('#')
+    if not _HEX_COLOR.match(value):
+        raise ValueError(f"Invalid color: {value!r}. Use a 6-digit hex value like 4ade80")
+    return value.lower()
+
+
+def render(width, height, background=DEFAULT_BACKGROUND, foreground=DEFAULT_FOREGROUND, text=DEFAULT_TEXT):
+    """Render a solid placeholder with centred text and return PNG bytes"""
+    image = Image.new('RGB', (width, height), f"#{background}")
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    if right - left <= width and bottom - top <= height:
+        draw.text(((width - (right - left)) / 2 - left, (height - (bottom - top)) / 2 - top),
+                  text, fill=f"#{foreground}", font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+class PlaceholderCache:
+    """LRU of rendered placeholders keyed by size and colors"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, width, height, background=DEFAULT_BACKGROUND, foreground=DEFAULT_FOREGROUND):
+        if not (1 <= width <= MAX_DIMENSION and 1 <= height <= MAX_DIMENSION):
+            raise ValueError(f"Placeholder dimensions must be between 1 and {MAX_DIMENSION}")
+        key = (width, height, background, foreground)
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return self._images[key]
+
+        # Render outside the lock; a duplicate render on a race is harmless
+        data = render(width, height, background, foreground)
+        with self._lock:
+            self._images[key] = data
+            self._images.move_to_end(key)
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+        return data
+
+    def prerender(self, sizes=COMMON_SIZES):
+        for width, height in sizes:
+            self.get(width, height)
+
+    def __len__(self):
+        return len(self._images)
@@ -0,0 +1,243 @@
+"""Day-partitioned scan log retention and compressed columnar archives"""
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Category derived from the product name, shared by /api/stats and the archives
+SCAN_CATEGORY_SQL = '''
+    CASE
+        WHEN product_name LIKE '%shampoo%' OR product_name LIKE '%brush%' THEN 'Beauty'
+        WHEN product_name LIKE '%coffee%' OR product_name LIKE '%honey%' THEN 'Grocery'
+        WHEN product_name LIKE '%detergent%' OR product_name LIKE '%sponge%' THEN 'Home'
+        WHEN product_name LIKE '%razor%' OR product_name LIKE '%towel%' THEN 'Personal Care'
+        ELSE 'Kitchen'
+    END
+'''
+
+# Excludes rows of days already summarised in the manifest. Compaction commits
+# the manifest before deleting the archived rows, so without this filter they
+# would be counted twice until the deletes finish
+LIVE_SCANS_SQL = 'substr(timestamp, 1, 10) NOT IN (SELECT day FROM scan_archives)'
+
+ARCHIVE_COLUMNS = ('id', 'timestamp', 'barcode', 'product_name', 'ecoscore', 'user_ip')
+
+
+def partition_bounds(day):
+    """Timestamp range [start, end) covering one UTC day partition"""
+    return day.isoformat(), (day + timedelta(days=1)).isoformat()
+
+
+def utc_today():
+    return datetime.now(timezone.utc).date()
+
+
+class ScanArchive:
+    """Moves scan partitions older than the retention policy into archive files.
+
+    Every UTC day of the ``scans`` table is a partition. Expired partitions are
+    written to ``scans-YYYY-MM-DD.npz`` (one compressed array per column) and
+    then deleted from SQLite in small batches so ``/api/scan`` writers only ever
+    wait for one short transaction.
+    """
+
+    def __init__(self, db_path, archive_dir, retention_days=30, batch_size=500, batch_pause=0.05):
+        self.db_path = db_path
+        self.archive_dir = archive_dir
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self._compact_lock = threading.Lock()
+        self._lock_path = os.path.join(archive_dir, '.compact.lock')
+        self._compactor = None
+        self._stop = threading.Event()
+        os.makedirs(archive_dir, exist_ok=True)
+
+    @staticmethod
+    def init_tables(conn):
+        """Create the manifest of archived partitions"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS scan_archives (
+                day TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                ecoscore_sum INTEGER NOT NULL,
+                categories TEXT NOT NULL,
+                archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def partition_path(self, day):
+        return os.path.join(self.archive_dir, f"scans-{day.isoformat()}.npz")
+
+    # Compaction
+    def expired_partitions(self, today=None):
+        """Days still in the scans table that are past the retention policy"""
+        cutoff = (today or utc_today()) - timedelta(days=self.retention_days)
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT DISTINCT substr(timestamp, 1, 10) AS day FROM scans WHERE timestamp < ? ORDER BY day',
+                (cutoff.isoformat(),)
+            ).fetchall()
+        return [date.fromisoformat(row['day']) for row in rows]
+
+    def compact_partition(self, day):
+        """Archive one day partition and remove it from the scans table"""
+        start, end = partition_bounds(day)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f'SELECT id, timestamp, barcode, product_name, ecoscore, user_ip, {SCAN_CATEGORY_SQL} AS category '
+                'FROM scans WHERE timestamp >= ? AND timestamp < ? ORDER BY id',
+                (start, end)
+            ).fetchall()
+        if not rows:
+            return 0
+
+        columns = {
+            'id': np.array([r['id'] for r in rows], dtype=np.int64),
+            'timestamp': np.array([_epoch(r['timestamp']) for r in rows], dtype=np.int64),
+            'barcode': np.array([r['barcode'] or '' for r in rows], dtype=np.str_),
+            'product_name': np.array([r['product_name'] or '' for r in rows], dtype=np.str_),
+            'ecoscore': np.array([r['ecoscore'] or 0 for r in rows], dtype=np.int16),
+            'user_ip': np.array([r['user_ip'] or '' for r in rows], dtype=np.str_),
+        }
+        categories = Counter(r['category'] for r in rows)
+
+        path = self.partition_path(day)
+        manifest = self._manifest_row(day)
+        if manifest is not None and os.path.exists(path):
+            # A previous run archived part of this day; merge instead of overwriting
+            existing = self.read_partition(day)
+            fresh = ~np.isin(columns['id'], existing['id'])
+            columns = {name: np.concatenate([existing[name], columns[name][fresh]]) for name in ARCHIVE_COLUMNS}
+            categories = Counter(json.loads(manifest['categories'])) + Counter(
+                r['category'] for r, keep in zip(rows, fresh) if keep)
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **columns)
+        os.replace(tmp_path, path)
+
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO scan_archives (day, path, row_count, ecoscore_sum, categories)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (day.isoformat(), path, len(columns['id']), int(columns['ecoscore'].sum()),
+                  json.dumps(categories)))
+            conn.commit()
+
+        deleted = self._delete_partition(start, end, int(columns['id'].max()))
+        logger.info(f"Archived scan partition {day.isoformat()}: {deleted} rows -> {path}")
+        return deleted
+
+    def _delete_partition(self, start, end, max_id):
+        """Delete archived rows in short transactions so writers are not starved"""
+        deleted = 0
+        while True:
+            with self._connect() as conn:
+                cursor = conn.execute('''
+                    DELETE FROM scans WHERE id IN (
+                        SELECT id FROM scans WHERE timestamp >= ? AND timestamp < ? AND id <= ? LIMIT ?
+                    )
+                ''', (start, end, max_id, self.batch_size))
+                conn.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < self.batch_size:
+                return deleted
+            time.sleep(self.batch_pause)
+
+    def compact(self, today=None):
+        """Archive every expired partition"""
+        if not self._compact_lock.acquire(blocking=False):
+            return 0
+        try:
+            # Every worker runs a compactor; only one may write archives at a time
+            with open(self._lock_path, 'a') as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return 0
+                try:
+                    total = 0
+                    for day in self.expired_partitions(today):
+                        try:
+                            total += self.compact_partition(day)
+                        except Exception as e:
+                            logger.error(f"Compaction of {day.isoformat()} failed: {e}")
+                    return total
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            self._compact_lock.release()
+
+    def start_compactor(self, interval=3600):
+        """Run compaction in a background thread every ``interval`` seconds"""
+        if self._compactor is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.compact()
+
+        self._compactor = threading.Thread(target=run, name='scan-compaction', daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join(timeout=5)
+            self._compactor = None
+
+    # Reads
+    def _manifest_row(self, day):
+        with self._connect() as conn:
+            return conn.execute('SELECT * FROM scan_archives WHERE day = ?', (day.isoformat(),)).fetchone()
+
+    def archived_days(self, start_day, end_day):
+        """Map of archived days in [start_day, end_day] to their manifest rows"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT * FROM scan_archives WHERE day BETWEEN ? AND ?',
+                (start_day.isoformat(), end_day.isoformat())
+            ).fetchall()
+        return {date.fromisoformat(row['day']): row for row in rows}
+
+    def read_partition(self, day):
+        """Load an archived partition as a dict of column arrays"""
+        with np.load(self.partition_path(day), allow_pickle=False) as data:
+            return {name: data[name] for name in ARCHIVE_COLUMNS}
+
+    def totals(self):
+        """Scan count, EcoScore sum and categories across all archived partitions"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT row_count, ecoscore_sum, categories FROM scan_archives').fetchall()
+        categories = Counter()
+        for row in rows:
+            categories.update(json.loads(row['categories']))
+        return (sum(row['row_count'] for row in rows),
+                sum(row['ecoscore_sum'] for row in rows),
+                categories)
+
+
+def _epoch(timestamp):
+    """Convert a SQLite CURRENT_TIMESTAMP string (UTC) to unix seconds"""
+    return int(datetime.strptime(timestamp[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc).timestamp())
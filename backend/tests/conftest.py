@@ -0,0 +1,36 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# The backend modules are imported as top-level modules, like app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Empty database with the scans and user_stats tables from init_db"""
+    path = str(tmp_path / 'ecoscore.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute('''
+            CREATE TABLE scans (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                barcode TEXT NOT NULL,
+                product_name TEXT,
+                ecoscore INTEGER,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                user_ip TEXT
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE user_stats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_ip TEXT NOT NULL,
+                total_scans INTEGER DEFAULT 0,
+                eco_points INTEGER DEFAULT 0,
+                carbon_saved REAL DEFAULT 0.0,
+                last_scan DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    return path
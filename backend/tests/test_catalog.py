@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+import catalog as catalog_module
+from catalog import Catalog, CatalogError, CatalogSnapshot, write_snapshot
+
+RECORDS = {
+    'product:123': {'name': 'Bamboo toothbrush', 'ecoScore': 5},
+    'product:456': {'name': 'Coffee', 'ecoScore': 3},
+    'alternatives:123': [{'name': 'Wooden brush'}],
+    'alternatives:default': [],
+    'name:ünïcode': 'é',
+}
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'catalog.bin')
+    write_snapshot(path, RECORDS, version=7)
+
+    snapshot = CatalogSnapshot(path)
+    assert snapshot.version == 7
+    assert snapshot.count == len(RECORDS)
+    assert sorted(snapshot.keys()) == sorted(RECORDS)
+    for key, value in RECORDS.items():
+        assert snapshot.get(key) == value
+    assert snapshot.product('123') == RECORDS['product:123']
+    assert snapshot.alternatives('123') == RECORDS['alternatives:123']
+    assert snapshot.product('999') is None
+    assert 'product:000' not in snapshot
+
+
+def test_snapshot_rejects_foreign_files(tmp_path):
+    path = tmp_path / 'catalog.bin'
+    path.write_bytes(b'NOTACATALOG' + b'\0' * 32)
+    with pytest.raises(CatalogError):
+        CatalogSnapshot(str(path))
+
+
+def test_pinned_snapshot_stays_readable_after_publish(tmp_path):
+    catalog = Catalog(str(tmp_path), check_interval=0)
+    catalog.publish({'product:1': {'name': 'old'}})
+    pinned = catalog.snapshot()
+
+    # Enough publishes to prune the pinned version's file
+    for i in range(catalog_module.KEEP_VERSIONS + 1):
+        catalog.publish({'product:1': {'name': f'new-{i}'}})
+
+    assert not os.path.exists(pinned.path)
+    assert pinned.product('1') == {'name': 'old'}
+    assert catalog.snapshot().product('1') == {'name': f'new-{catalog_module.KEEP_VERSIONS}'}
+
+
+def test_snapshot_rereads_pointer_when_named_file_was_pruned(tmp_path, monkeypatch):
+    catalog = Catalog(str(tmp_path), check_interval=0)
+    catalog.publish({'product:1': {'name': 'first'}})
+    assert catalog.snapshot().product('1') == {'name': 'first'}
+    catalog.publish({'product:1': {'name': 'second'}})
+
+    # Simulate more publishes landing between reading the pointer and opening the file
+    opened = []
+    real_snapshot = catalog_module.CatalogSnapshot
+
+    def racing_snapshot(path):
+        if not opened:
+            opened.append(path)
+            raise FileNotFoundError(path)
+        return real_snapshot(path)
+
+    monkeypatch.setattr(catalog_module, 'CatalogSnapshot', racing_snapshot)
+    assert catalog.snapshot().product('1') == {'name': 'second'}
+    assert len(opened) == 1
+
+
+def test_snapshot_keeps_previous_version_if_pointer_keeps_moving(tmp_path, monkeypatch):
+    catalog = Catalog(str(tmp_path), check_interval=0)
+    catalog.publish({'product:1': {'name': 'first'}})
+    first = catalog.snapshot()
+    catalog.publish({'product:1': {'name': 'second'}})
+
+    def always_pruned(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(catalog_module, 'CatalogSnapshot', always_pruned)
+    assert catalog.snapshot() is first
+
+
+def test_ensure_published_publishes_once(tmp_path):
+    catalog = Catalog(str(tmp_path))
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {'product:1': {'name': 'seed'}}
+
+    assert catalog.ensure_published(build) is not None
+    assert catalog.ensure_published(build) is None
+    assert len(calls) == 1
@@ -0,0 +1,83 @@
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from columnstore import COLUMNS, ColumnStore
+
+
+def ts(day):
+    return int(datetime.strptime(day, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp())
+
+
+def test_barcode_with_line_separator_characters_round_trips(tmp_path):
+    store = ColumnStore(str(tmp_path))
+    payloads = ['abc\rdef', 'x\x1ey', 'line sep', 'plain']
+    for payload in payloads:
+        store.append(payload, 3, 'Home', now=ts('2024-01-01'))
+
+    # A fresh reader must see the same ids as the writer
+    reader = ColumnStore(str(tmp_path))
+    reader.barcodes.refresh()
+    assert reader.barcodes.values == payloads
+    assert [reader.barcodes.lookup(int(i)) for i in reader.window()['barcode']] == payloads
+
+
+def test_histogram_by_week_starts_on_monday(tmp_path):
+    store = ColumnStore(str(tmp_path))
+    store.append('a', 5, 'Home', now=ts('2024-01-01'))   # Monday
+    store.append('a', 5, 'Home', now=ts('2024-01-07'))   # Sunday, same week
+    store.append('b', 2, 'Home', now=ts('2024-01-08'))   # next Monday
+    store.append('b', 2, 'Home', now=ts('2024-01-22'))   # skips a week
+
+    assert store.histogram_by('week') == {
+        '2024-01-01': {5: 2},
+        '2024-01-08': {2: 1},
+        '2024-01-22': {2: 1},
+    }
+
+
+def test_histogram_by_category_and_window(tmp_path):
+    store = ColumnStore(str(tmp_path))
+    store.append('a', 5, 'Beauty', now=100)
+    store.append('b', 1, 'Home', now=200)
+    store.append('c', 4, 'Beauty', now=300)
+    store.append('d', 4, None, now=400)
+
+    assert store.histogram_by('category') == {
+        'Beauty': {4: 1, 5: 1},
+        'Home': {1: 1},
+        'Unknown': {4: 1},
+    }
+    assert store.histogram_by('category', start=200, end=400) == {'Beauty': {4: 1}, 'Home': {1: 1}}
+    assert store.histogram() == {1: 1, 4: 2, 5: 1}
+
+
+def test_top_barcodes_orders_by_count(tmp_path):
+    store = ColumnStore(str(tmp_path))
+    for barcode in ['a', 'b', 'b', 'c', 'c', 'c']:
+        store.append(barcode, 3, 'Home', now=100)
+
+    assert store.top_barcodes(2) == [('c', 3), ('b', 2)]
+    assert store.top_barcodes(10) == [('c', 3), ('b', 2), ('a', 1)]
+
+
+def test_append_truncates_torn_tail(tmp_path):
+    store = ColumnStore(str(tmp_path))
+    store.append('a', 3, 'Home', now=100)
+    store.append('b', 4, 'Home', now=200)
+
+    # A writer crashed after writing only some columns of a third row
+    with open(os.path.join(str(tmp_path), 'timestamp.bin'), 'ab') as f:
+        f.write(np.array([300], dtype=COLUMNS['timestamp']).tobytes())
+    with open(os.path.join(str(tmp_path), 'barcode.bin'), 'ab') as f:
+        f.write(b'\x01\x00')
+    assert len(store) == 2
+
+    store.append('c', 5, 'Home', now=400)
+
+    cols = store.window()
+    assert list(cols['timestamp']) == [100, 200, 400]
+    assert list(cols['ecoscore']) == [3, 4, 5]
+    for name, dtype in COLUMNS.items():
+        assert os.path.getsize(os.path.join(str(tmp_path), f'{name}.bin')) == 3 * dtype.itemsize
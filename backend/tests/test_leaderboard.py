@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+from leaderboard import Leaderboard, user_id_for
+
+SECRET = 'test-secret'
+
+
+@pytest.fixture
+def leaderboard(db_path):
+    points = [('ip1', 50), ('ip2', 40), ('ip3', 40), ('ip4', 30), ('ip5', 20), ('ip6', 10), ('ip7', 10)]
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            'INSERT INTO user_stats (user_ip, total_scans, eco_points) VALUES (?, 1, ?)', points
+        )
+    board = Leaderboard(db_path, SECRET, cache_size=3, sync_interval=3600)
+    board.load()
+    return board
+
+
+def test_user_id_is_keyed():
+    assert user_id_for('10.0.0.1', 'a') != user_id_for('10.0.0.1', 'b')
+    assert user_id_for('10.0.0.1', 'a') == user_id_for('10.0.0.1', 'a')
+
+
+def test_cursor_pagination_visits_every_user_once(leaderboard):
+    seen, cursor = [], None
+    while True:
+        entries, cursor = leaderboard.page(2, cursor)
+        seen.extend(entries)
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert len({entry['userId'] for entry in seen}) == 7
+    assert [entry['ecoPoints'] for entry in seen] == [50, 40, 40, 30, 20, 10, 10]
+    # Tied users share a rank
+    assert [entry['rank'] for entry in seen] == [1, 2, 2, 4, 5, 6, 6]
+
+
+def test_invalid_cursor_is_rejected(leaderboard):
+    with pytest.raises(ValueError):
+        leaderboard.page(2, 'not-a-cursor')
+
+
+def test_update_into_top_k_invalidates_cache(leaderboard):
+    leaderboard.page(3)
+    leaderboard.update('ip6', 45, 2)
+
+    entries, _ = leaderboard.page(3)
+    assert [entry['userId'] for entry in entries][:2] == [leaderboard.user_id('ip1'), leaderboard.user_id('ip6')]
+    assert leaderboard.user(leaderboard.user_id('ip6'))['rank'] == 2
+
+
+def test_update_below_top_k_keeps_cache(leaderboard):
+    leaderboard.page(3)
+    cached = leaderboard._top_cache
+    leaderboard.update('ip7', 15, 2)
+
+    assert leaderboard._top_cache is cached
+    assert leaderboard.user(leaderboard.user_id('ip7'))['rank'] == 6
+
+
+def test_top_k_member_dropping_out_invalidates_cache(leaderboard):
+    leaderboard.page(3)
+    leaderboard.update('ip1', 5, 2)
+    assert leaderboard._top_cache is None
+
+    entries, _ = leaderboard.page(3)
+    assert leaderboard.user_id('ip1') not in [entry['userId'] for entry in entries]
+    assert [entry['ecoPoints'] for entry in entries] == [40, 40, 30]
+
+
+def test_sync_picks_up_other_writers_without_regressing_local_updates(leaderboard, db_path):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE user_stats SET last_scan = '2024-01-01 00:00:00'")
+    leaderboard.load()
+    with sqlite3.connect(db_path) as conn:
+        # Another worker scanned for ip5 and ip8; this worker's ip4 update is
+        # newer than what its row in the database says
+        conn.execute("UPDATE user_stats SET eco_points = 55, total_scans = 2, last_scan = '2024-01-02 00:00:00' WHERE user_ip = 'ip5'")
+        conn.execute("UPDATE user_stats SET total_scans = 1, last_scan = '2024-01-02 00:00:00' WHERE user_ip = 'ip4'")
+        conn.execute("INSERT INTO user_stats (user_ip, total_scans, eco_points, last_scan) VALUES ('ip8', 1, 5, '2024-01-02 00:00:00')")
+    leaderboard.update('ip4', 70, 3)
+
+    leaderboard.sync()
+
+    assert leaderboard.user(leaderboard.user_id('ip4'))['rank'] == 1
+    assert leaderboard.user(leaderboard.user_id('ip5'))['rank'] == 2
+    assert leaderboard.user(leaderboard.user_id('ip8'))['totalUsers'] == 8
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import loadtest
+from loadtest import code128_modules, compare, percentile, saturation_points
+
+START_B = '11010010000'
+STOP = '1100011101011'
+
+
+def decode_values(modules):
+    """Split Code 128 modules into symbol values using the width table"""
+    patterns = {}
+    for value, widths in enumerate(loadtest._CODE128_WIDTHS[:106]):
+        patterns[''.join(('1' if i % 2 == 0 else '0') * int(w) for i, w in enumerate(widths))] = value
+    body = modules[:-len(STOP)]
+    return [patterns[body[i:i + 11]] for i in range(0, len(body), 11)]
+
+
+def test_code128_encodes_payload_with_checksum():
+    modules = code128_modules('PJJ123C')
+    assert modules.startswith(START_B)
+    assert modules.endswith(STOP)
+    assert len(modules) == 11 * (len('PJJ123C') + 2) + len(STOP)
+
+    values = decode_values(modules)
+    assert values[0] == 104
+    assert values[1:-1] == [ord(char) - 32 for char in 'PJJ123C']
+    # 104 + 48*1 + 42*2 + 42*3 + 17*4 + 18*5 + 19*6 + 35*7 = 879; 879 % 103 = 55
+    assert values[-1] == 55
+
+
+def test_code128_rejects_characters_outside_set_b():
+    with pytest.raises(ValueError):
+        code128_modules('café')
+    with pytest.raises(ValueError):
+        code128_modules('tab\t')
+
+
+def test_catalog_barcodes_follow_the_seed():
+    with open(loadtest.CATALOG_SEED) as f:
+        assert loadtest.CATALOG_BARCODES == list(json.load(f)['products'])
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 90) == 90
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([10, 20, 30], 50) == 20
+    assert percentile([10, 20, 30], 0) == 10
+    assert percentile([], 50) is None
+
+
+def step(rate, p99, throughput=10.0, error_rate=0.0, endpoint='GET /api/stats'):
+    return {"rate": rate, "endpoints": {endpoint: {"p99Ms": p99, "throughput": throughput, "errorRate": error_rate}}}
+
+
+def test_saturation_points_report_first_failing_rate():
+    steps = [
+        step(5, 100),
+        step(10, 100, error_rate=0.05),
+        step(20, 900),
+    ]
+    steps[0]["endpoints"]['POST /api/scan'] = {"p99Ms": 600, "throughput": 1.0, "errorRate": 0.0}
+
+    assert saturation_points(steps, slo_ms=500, max_error_rate=0.01) == {
+        'POST /api/scan': 5,
+        'GET /api/stats': 10,
+    }
+
+
+def test_compare_flags_regressions_beyond_tolerance_and_jitter():
+    baseline = {"steps": [step(10, 100), step(20, 2)]}
+
+    assert compare({"steps": [step(10, 105), step(20, 4)]}, baseline, 0.1, 5, 0.01) == []
+    assert compare({"steps": [step(40, 900)]}, baseline, 0.1, 5, 0.01) == []
+
+    regressions = compare({"steps": [step(10, 150, throughput=8.0, error_rate=0.05)]}, baseline, 0.1, 5, 0.01)
+    assert len(regressions) == 3
+    assert regressions[0] == 'GET /api/stats @ 10/s: p99 100ms -> 150ms'
+    assert 'throughput' in regressions[1]
+    assert 'error rate' in regressions[2]
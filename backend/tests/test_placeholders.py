@@ -0,0 +1,52 @@
+import io
+
+import pytest
+from PIL import Image
+
+import placeholders
+from placeholders import MAX_DIMENSION, PlaceholderCache, parse_color
+
+
+def test_parse_color():
+    assert parse_color('4ADE80', 'ffffff') == '4ade80'
+    assert parse_color('#112233', 'ffffff') == '112233'
+    assert parse_color(None, '4ade80') == '4ade80'
+    assert parse_color('', '4ade80') == '4ade80'
+    for value in ['fff', '12345g', '1234567', 'red']:
+        with pytest.raises(ValueError):
+            parse_color(value, 'ffffff')
+
+
+def test_rendered_png_has_requested_size_and_background():
+    data = PlaceholderCache().get(40, 30, '112233')
+    image = Image.open(io.BytesIO(data))
+    assert image.format == 'PNG'
+    assert image.size == (40, 30)
+    assert image.convert('RGB').getpixel((0, 0)) == (0x11, 0x22, 0x33)
+
+
+@pytest.mark.parametrize('width, height', [(0, 10), (10, 0), (MAX_DIMENSION + 1, 10), (10, MAX_DIMENSION + 1)])
+def test_dimensions_are_capped(width, height):
+    with pytest.raises(ValueError):
+        PlaceholderCache().get(width, height)
+
+
+def test_lru_evicts_least_recently_used(monkeypatch):
+    renders = []
+
+    def fake_render(width, height, background, foreground):
+        renders.append((width, height))
+        return f'{width}x{height}'.encode()
+
+    monkeypatch.setattr(placeholders, 'render', fake_render)
+    cache = PlaceholderCache(max_entries=2)
+    cache.get(1, 1)
+    cache.get(2, 2)
+    cache.get(1, 1)   # hit; (2, 2) is now the oldest
+    cache.get(3, 3)   # evicts (2, 2)
+
+    assert len(cache) == 2
+    assert renders == [(1, 1), (2, 2), (3, 3)]
+    assert cache.get(1, 1) == b'1x1'
+    cache.get(2, 2)
+    assert renders[-1] == (2, 2)
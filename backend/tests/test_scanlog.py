@@ -0,0 +1,82 @@
+import sqlite3
+from datetime import date
+
+from scanlog import LIVE_SCANS_SQL, ScanArchive
+
+DAY = date(2024, 1, 10)
+
+
+def insert_scans(db_path, rows):
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            'INSERT INTO scans (id, barcode, product_name, ecoscore, timestamp, user_ip) VALUES (?, ?, ?, ?, ?, ?)',
+            rows
+        )
+
+
+def make_archive(db_path, tmp_path):
+    archive = ScanArchive(db_path, str(tmp_path / 'archive'), retention_days=30, batch_size=2, batch_pause=0)
+    with sqlite3.connect(db_path) as conn:
+        ScanArchive.init_tables(conn)
+    return archive
+
+
+def live_count(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute('SELECT COUNT(*) FROM scans').fetchone()[0]
+
+
+def test_compact_archives_expired_day_and_deletes_rows(db_path, tmp_path):
+    insert_scans(db_path, [
+        (1, 'a', 'Bamboo toothbrush', 5, '2024-01-10 08:00:00', 'ip1'),
+        (2, 'b', 'Coffee', 3, '2024-01-10 09:00:00', 'ip2'),
+        (3, 'c', 'Razor', 2, '2024-01-10 23:59:59', 'ip1'),
+        (4, 'd', 'Honey', 4, '2024-02-20 10:00:00', 'ip3'),
+    ])
+    archive = make_archive(db_path, tmp_path)
+
+    assert archive.compact(today=date(2024, 2, 21)) == 3
+
+    columns = archive.read_partition(DAY)
+    assert list(columns['id']) == [1, 2, 3]
+    assert list(columns['barcode']) == ['a', 'b', 'c']
+    assert live_count(db_path) == 1
+    assert archive.totals() == (3, 10, {'Beauty': 1, 'Grocery': 1, 'Personal Care': 1})
+
+
+def test_recompacting_partially_archived_day_merges_without_duplicates(db_path, tmp_path, monkeypatch):
+    insert_scans(db_path, [
+        (1, 'a', 'Coffee', 3, '2024-01-10 08:00:00', 'ip1'),
+        (2, 'b', 'Coffee', 4, '2024-01-10 09:00:00', 'ip2'),
+    ])
+    archive = make_archive(db_path, tmp_path)
+
+    # Simulate a crash after the archive and manifest were written but
+    # before any rows were deleted
+    monkeypatch.setattr(archive, '_delete_partition', lambda start, end, max_id: 0)
+    archive.compact_partition(DAY)
+    monkeypatch.undo()
+    insert_scans(db_path, [(3, 'c', 'Razor', 5, '2024-01-10 10:00:00', 'ip3')])
+
+    archive.compact_partition(DAY)
+
+    columns = archive.read_partition(DAY)
+    assert sorted(columns['id']) == [1, 2, 3]
+    assert live_count(db_path) == 0
+    assert archive.totals() == (3, 12, {'Grocery': 2, 'Personal Care': 1})
+
+
+def test_live_totals_skip_days_archived_before_their_rows_are_deleted(db_path, tmp_path, monkeypatch):
+    insert_scans(db_path, [
+        (1, 'a', 'Coffee', 3, '2024-01-10 08:00:00', 'ip1'),
+        (2, 'b', 'Coffee', 4, '2024-02-20 09:00:00', 'ip2'),
+    ])
+    archive = make_archive(db_path, tmp_path)
+    monkeypatch.setattr(archive, '_delete_partition', lambda start, end, max_id: 0)
+    archive.compact(today=date(2024, 2, 21))
+
+    with sqlite3.connect(db_path) as conn:
+        live = conn.execute(f'SELECT COUNT(*), SUM(ecoscore) FROM scans WHERE {LIVE_SCANS_SQL}').fetchone()
+    archived_scans, archived_sum, _ = archive.totals()
+    assert live[0] + archived_scans == 2
+    assert live[1] + archived_sum == 7
@@ -0,0 +1,86 @@
+import sqlite3
+
+import pytest
+
+from timeseries import ScanTimeSeries, parse_duration
+
+NOW = 1_700_000_000
+
+
+@pytest.fixture
+def series_db(db_path):
+    with sqlite3.connect(db_path) as conn:
+        ScanTimeSeries.init_tables(conn)
+    return db_path
+
+
+def last_point(series):
+    return series.query(5, 1, now=NOW)[-1]
+
+
+def test_parse_duration():
+    assert parse_duration('90m') == 90
+    assert parse_duration('2h') == 120
+    with pytest.raises(ValueError):
+        parse_duration('30s')
+
+
+def test_flush_writes_deltas_and_query_does_not_double_count(series_db):
+    series = ScanTimeSeries(series_db)
+    series.record_scan(4, 'Beauty', now=NOW)
+    series.record_scan(2, 'Home', now=NOW)
+    assert last_point(series)['scans'] == 2
+
+    series.flush()
+    series.record_scan(3, 'Home', now=NOW)
+    point = last_point(series)
+    assert point['scans'] == 3
+    assert point['categories'] == {'Beauty': 1, 'Home': 2}
+    assert point['averageEcoScore'] == 3.0
+
+
+def test_workers_share_rolled_up_history(series_db):
+    first, second = ScanTimeSeries(series_db), ScanTimeSeries(series_db)
+    first.record_scan(5, 'Beauty', now=NOW)
+    second.record_scan(1, 'Home', now=NOW)
+    second.record_failure(now=NOW)
+    second.flush()
+
+    point = last_point(first)
+    assert point['scans'] == 2
+    assert point['failures'] == 1
+
+
+def test_failed_flush_restores_deltas(series_db, monkeypatch):
+    series = ScanTimeSeries(series_db)
+    series.record_scan(4, 'Beauty', now=NOW)
+
+    def fail(deltas):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(series, '_write', fail)
+    assert series.flush() == 0
+    assert last_point(series)['scans'] == 1
+
+    monkeypatch.undo()
+    assert series.flush() == 1
+    assert last_point(ScanTimeSeries(series_db))['scans'] == 1
+
+
+def test_evicted_bucket_survives_failed_write(series_db, monkeypatch):
+    series = ScanTimeSeries(series_db, capacity=2)
+    series.record_scan(4, 'Beauty', now=NOW)
+
+    def fail(deltas):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(series, '_write', fail)
+    # Wraps the ring onto NOW's slot; the write fails but the scan is kept
+    series.record_scan(2, 'Home', now=NOW + 2 * 60)
+    assert series.query(3, 1, now=NOW + 2 * 60)[0]['scans'] == 1
+
+    monkeypatch.undo()
+    series.flush()
+    point = ScanTimeSeries(series_db).query(3, 1, now=NOW + 2 * 60)
+    assert [p['scans'] for p in point] == [1, 0, 1]
+    assert point[0]['categories'] == {'Beauty': 1}
@@ -0,0 +1,288 @@
+"""In-memory per-minute scan counters with periodic flush to SQLite"""
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = 60
+DEFAULT_CAPACITY = 24 * 60  # one day of minute buckets
+MAX_WINDOW = 366 * 24 * 60  # minutes
+
+_DURATION_RE = re.compile(r'^(\d+)([smhd])$')
+_DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_duration(value):
+    """Parse durations like '90s', '15m', '6h' or '7d' into whole minutes"""
+    match = _DURATION_RE.match((value or '').strip().lower())
+    if not match:
+        raise ValueError(f"Invalid duration: {value!r}. Use e.g. 30m, 6h, 7d")
+    seconds = int(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    if seconds < BUCKET_SECONDS or seconds % BUCKET_SECONDS:
+        raise ValueError(f"Duration must be a whole number of minutes: {value!r}")
+    return seconds // BUCKET_SECONDS
+
+
+def current_minute(now=None):
+    """Epoch minute for the given (or current) unix time"""
+    return int((time.time() if now is None else now) // BUCKET_SECONDS)
+
+
+class _Bucket:
+    """Counters for a single minute"""
+    __slots__ = ('minute', 'scans', 'ecoscore_sum', 'failures', 'categories',
+                 'flushed_scans', 'flushed_ecoscore_sum', 'flushed_failures', 'flushed_categories')
+
+    def __init__(self, minute):
+        self.minute = minute
+        self.scans = 0
+        self.ecoscore_sum = 0
+        self.failures = 0
+        self.categories = Counter()
+        # What has already been written to SQLite, so flushes only add deltas
+        self.flushed_scans = 0
+        self.flushed_ecoscore_sum = 0
+        self.flushed_failures = 0
+        self.flushed_categories = Counter()
+
+    def is_dirty(self):
+        return (self.scans != self.flushed_scans
+                or self.failures != self.flushed_failures
+                or self.categories != self.flushed_categories)
+
+
+class ScanTimeSeries:
+    """Ring buffer of per-minute scan buckets for this process.
+
+    Buckets are flushed to the ``scan_timeseries`` tables as additive deltas so
+    several worker processes can share the same rolled-up history. Queries
+    read that history and add this process's not-yet-flushed deltas.
+    """
+
+    def __init__(self, db_path, capacity=DEFAULT_CAPACITY):
+        self.db_path = db_path
+        self.capacity = capacity
+        self._buckets = [None] * capacity
+        # Deltas of buckets evicted from the ring before they were flushed
+        self._evicted = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+
+    # Recording
+    def _bucket(self, minute):
+        slot = minute % self.capacity
+        bucket = self._buckets[slot]
+        if bucket is None or bucket.minute != minute:
+            if bucket is not None and bucket.is_dirty():
+                # Evicting unflushed data would lose it; keep the delta for the
+                # next flush (caller holds the lock, so no SQLite write here)
+                self._evicted.append(self._delta(bucket))
+            bucket = _Bucket(minute)
+            self._buckets[slot] = bucket
+        return bucket
+
+    def record_scan(self, ecoscore, category, now=None):
+        """Count a successful scan"""
+        with self._lock:
+            bucket = self._bucket(current_minute(now))
+            bucket.scans += 1
+            bucket.ecoscore_sum += ecoscore
+            bucket.categories[category or 'Unknown'] += 1
+        self._flush_evicted()
+
+    def record_failure(self, now=None):
+        """Count a failed scan (no barcode detected or processing error)"""
+        with self._lock:
+            bucket = self._bucket(current_minute(now))
+            bucket.failures += 1
+        self._flush_evicted()
+
+    def _flush_evicted(self):
+        """Write evicted deltas now rather than on the next timed flush.
+
+        Skipped if a flush is already running, since that flush picks them up.
+        """
+        if not self._evicted or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._flush_locked()
+        finally:
+            self._flush_lock.release()
+
+    # Queries
+    def unflushed(self, start_minute, end_minute):
+        """Return {minute: (scans, ecoscore_sum, failures, categories)} not yet written to SQLite"""
+        rows = {}
+        with self._lock:
+            for bucket in self._buckets:
+                if bucket is not None and start_minute <= bucket.minute <= end_minute and bucket.is_dirty():
+                    rows[bucket.minute] = (bucket.scans - bucket.flushed_scans,
+                                           bucket.ecoscore_sum - bucket.flushed_ecoscore_sum,
+                                           bucket.failures - bucket.flushed_failures,
+                                           dict(bucket.categories - bucket.flushed_categories))
+            for minute, scans, ecoscore_sum, failures, categories in self._evicted:
+                if start_minute <= minute <= end_minute:
+                    row_scans, row_sum, row_failures, row_categories = rows.get(minute, (0, 0, 0, {}))
+                    rows[minute] = (row_scans + scans, row_sum + ecoscore_sum, row_failures + failures,
+                                    dict(Counter(row_categories) + categories))
+        return rows
+
+    def query(self, window, step, now=None):
+        """Aggregate the last ``window`` minutes into ``step``-minute points.
+
+        The rolled-up tables hold what every process has flushed; this
+        process's unflushed deltas are added on top, so recent points are
+        complete up to the other workers' last flush.
+        """
+        end = current_minute(now)
+        start = end - window + 1
+        # Hold the flush lock so a concurrent flush cannot move deltas from
+        # memory to SQLite between the two reads (counting them twice or not at all)
+        with self._flush_lock:
+            rollup = self._read_rollup(start, end)
+            pending = self.unflushed(start, end)
+
+        count = (window + step - 1) // step
+        scans, ecoscore_sums, failures = [0] * count, [0] * count, [0] * count
+        categories = [Counter() for _ in range(count)]
+        for rows in (rollup, pending):
+            for minute, (row_scans, row_sum, row_failures, row_categories) in rows.items():
+                i = (minute - start) // step
+                scans[i] += row_scans
+                ecoscore_sums[i] += row_sum
+                failures[i] += row_failures
+                categories[i].update(row_categories)
+
+        return [{
+            "timestamp": (start + i * step) * BUCKET_SECONDS,
+            "scans": scans[i],
+            "averageEcoScore": round(ecoscore_sums[i] / scans[i], 2) if scans[i] else None,
+            "failures": failures[i],
+            "categories": dict(categories[i])
+        } for i in range(count)]
+
+    # Persistence
+    @staticmethod
+    def init_tables(conn):
+        """Create the rolled-up time-series tables"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS scan_timeseries (
+                minute INTEGER PRIMARY KEY,
+                scans INTEGER NOT NULL DEFAULT 0,
+                ecoscore_sum INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS scan_timeseries_categories (
+                minute INTEGER NOT NULL,
+                category TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (minute, category)
+            ) WITHOUT ROWID
+        ''')
+
+    @staticmethod
+    def _delta(bucket):
+        """Capture unflushed counts and mark them flushed (caller holds the lock)"""
+        delta = (bucket.minute,
+                 bucket.scans - bucket.flushed_scans,
+                 bucket.ecoscore_sum - bucket.flushed_ecoscore_sum,
+                 bucket.failures - bucket.flushed_failures,
+                 bucket.categories - bucket.flushed_categories)
+        bucket.flushed_scans = bucket.scans
+        bucket.flushed_ecoscore_sum = bucket.ecoscore_sum
+        bucket.flushed_failures = bucket.failures
+        bucket.flushed_categories = Counter(bucket.categories)
+        return delta
+
+    def _write(self, deltas):
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            conn.executemany('''
+                INSERT INTO scan_timeseries (minute, scans, ecoscore_sum, failures)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(minute) DO UPDATE SET
+                    scans = scans + excluded.scans,
+                    ecoscore_sum = ecoscore_sum + excluded.ecoscore_sum,
+                    failures = failures + excluded.failures
+            ''', [d[:4] for d in deltas])
+            conn.executemany('''
+                INSERT INTO scan_timeseries_categories (minute, category, count)
+                VALUES (?, ?, ?)
+                ON CONFLICT(minute, category) DO UPDATE SET count = count + excluded.count
+            ''', [(d[0], category, count) for d in deltas for category, count in d[4].items()])
+            conn.commit()
+
+    def flush(self):
+        """Write all unflushed deltas to SQLite"""
+        with self._flush_lock:
+            return self._flush_locked()
+
+    def _flush_locked(self):
+        with self._lock:
+            deltas = self._evicted + [self._delta(b) for b in self._buckets if b is not None and b.is_dirty()]
+            self._evicted = []
+        if not deltas:
+            return 0
+        try:
+            self._write(deltas)
+        except sqlite3.Error as e:
+            logger.error(f"Time-series flush error: {e}")
+            self._restore(deltas)
+            return 0
+        return len(deltas)
+
+    def _restore(self, deltas):
+        """Put back deltas that failed to flush so the next flush retries them"""
+        with self._lock:
+            for minute, scans, ecoscore_sum, failures, categories in deltas:
+                bucket = self._buckets[minute % self.capacity]
+                if bucket is None or bucket.minute != minute:
+                    # Evicted since the flush started; retry it from the side list
+                    self._evicted.append((minute, scans, ecoscore_sum, failures, categories))
+                    continue
+                bucket.flushed_scans -= scans
+                bucket.flushed_ecoscore_sum -= ecoscore_sum
+                bucket.flushed_failures -= failures
+                bucket.flushed_categories -= categories
+
+    def _read_rollup(self, start_minute, end_minute):
+        rows = {}
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            for minute, scans, ecoscore_sum, failures in conn.execute(
+                    'SELECT minute, scans, ecoscore_sum, failures FROM scan_timeseries '
+                    'WHERE minute BETWEEN ? AND ?', (start_minute, end_minute)):
+                rows[minute] = (scans, ecoscore_sum, failures, {})
+            for minute, category, count in conn.execute(
+                    'SELECT minute, category, count FROM scan_timeseries_categories '
+                    'WHERE minute BETWEEN ? AND ?', (start_minute, end_minute)):
+                if minute in rows:
+                    rows[minute][3][category] = count
+        return rows
+
+    def start_flusher(self, interval=30):
+        """Flush in a background thread every ``interval`` seconds"""
+        if self._flusher is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.flush()
+
+        self._flusher = threading.Thread(target=run, name='timeseries-flush', daemon=True)
+        self._flusher.start()
+
+    def stop_flusher(self):
+        """Stop the background thread and flush what is left"""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+            self._flusher = None
+        self.flush()